@@ -0,0 +1,157 @@
+"""
+Benchmark for loading and querying a Degrees dataset.
+
+Reports the load time and peak memory of a cold load (parsing the
+CSV files) and a warm load (from the snapshot), each measured in a
+fresh process, then the p50/p99 latency of every search strategy
+over a fixed, seeded set of random person pairs.
+
+Usage: python benchmark.py directory [--queries N] [--json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import statistics
+import sys
+import time
+
+import degrees
+
+STRATEGIES = ["bfs", "bidirectional", "bipartite", "astar"]
+
+
+def peak_memory():
+    """Returns the peak resident memory of this process in MiB."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def measure_load(directory, cache):
+    """Loads a directory and returns (seconds, peak MiB)."""
+    start = time.perf_counter()
+    degrees.load_data(directory, cache=cache)
+    return time.perf_counter() - start, peak_memory()
+
+
+def load_in_fresh_process(directory, cache):
+    """
+    Runs measure_load in a new interpreter, for clean timings. The
+    caller must not have loaded any data yet, since the peak memory
+    of a process carries over into the processes it starts.
+    """
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(measure_load, (directory, cache))
+
+
+def percentile(values, fraction):
+    """Returns the nearest-rank percentile of a list of values."""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1,
+                      round(fraction * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def sample_pairs(count, seed):
+    """Returns a fixed list of random (source, target) person ids."""
+    rng = random.Random(seed)
+    ids = sorted(degrees.people)
+    return [(rng.choice(ids), rng.choice(ids)) for _ in range(count)]
+
+
+def time_queries(pairs, strategy):
+    """Returns latency statistics of a strategy over the pairs."""
+    latencies = []
+    connected = 0
+    for source, target in pairs:
+        start = time.perf_counter()
+        path = degrees.shortest_path(source, target, strategy)
+        latencies.append((time.perf_counter() - start) * 1000)
+        connected += path is not None
+    return {
+        "strategy": strategy,
+        "queries": len(pairs),
+        "connected": connected,
+        "mean_ms": statistics.fmean(latencies),
+        "p50_ms": percentile(latencies, 0.50),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": max(latencies),
+    }
+
+
+def run(directory, queries, seed, strategies):
+    """Runs every measurement and returns the results as a dict."""
+    results = {"directory": directory, "load": {}}
+
+    # Cold first, then write the snapshot in a child of its own (this
+    # process stays small until both loads are measured) and time the
+    # warm load from it
+    seconds, peak = load_in_fresh_process(directory, False)
+    results["load"]["cold"] = {"seconds": seconds, "peak_mib": peak}
+    load_in_fresh_process(directory, True)
+    seconds, peak = load_in_fresh_process(directory, True)
+    results["load"]["warm"] = {"seconds": seconds, "peak_mib": peak}
+
+    degrees.load_data(directory)
+    results["people"] = len(degrees.people)
+    results["movies"] = len(degrees.movies)
+    results["landmarks"] = degrees.landmark_index is not None
+
+    pairs = sample_pairs(queries, seed)
+    results["queries"] = [time_queries(pairs, strategy)
+                          for strategy in strategies]
+    return results
+
+
+def report(results):
+    """Returns a printable table of benchmark results."""
+    lines = [f"{results['directory']}: {results['people']} people, "
+             f"{results['movies']} movies"]
+    for name, load in results["load"].items():
+        peak = load["peak_mib"]
+        memory = "n/a" if peak is None else f"{peak:.1f} MiB"
+        lines.append(f"  {name} load: {load['seconds']:.3f} s, "
+                     f"peak {memory}")
+    queries = results["queries"]
+    if queries:
+        lines.append(f"  {queries[0]['connected']} of "
+                     f"{queries[0]['queries']} pairs connected, the rest "
+                     "are answered by the component check")
+    lines.append(f"  {'strategy':<14}{'p50 ms':>10}{'p99 ms':>10}"
+                 f"{'mean ms':>10}{'max ms':>10}")
+    for row in results["queries"]:
+        lines.append(f"  {row['strategy']:<14}{row['p50_ms']:>10.3f}"
+                     f"{row['p99_ms']:>10.3f}{row['mean_ms']:>10.3f}"
+                     f"{row['max_ms']:>10.3f}")
+    if not results["landmarks"]:
+        lines.append("  (no landmark index, astar ran without bounds)")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark loading and querying a Degrees dataset.")
+    parser.add_argument("directory")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--strategies", default=",".join(STRATEGIES),
+                        help="comma-separated strategies to time")
+    parser.add_argument("--json", action="store_true",
+                        help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.directory, args.queries, args.seed,
+                  args.strategies.split(","))
+    print(json.dumps(results, indent=2) if args.json else report(results))
+
+
+if __name__ == "__main__":
+    main()
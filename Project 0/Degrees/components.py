@@ -0,0 +1,78 @@
+"""
+Connected components of the Degrees co-star graph.
+
+Every person is labelled with a component id by union-find over the
+star credits: all stars of a movie end up in one set. Two people are
+connected exactly when their labels are equal, so a query between
+different components can be answered without searching.
+"""
+
+from array import array
+from collections import Counter
+
+
+def find(parent, x):
+    """Returns the root of x, halving the path on the way up."""
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+
+def union(parent, size, a, b):
+    """Merges the sets of a and b, hanging the smaller under the larger."""
+    a = find(parent, a)
+    b = find(parent, b)
+    if a == b:
+        return
+    if size[a] < size[b]:
+        a, b = b, a
+    parent[b] = a
+    size[a] += size[b]
+
+
+def label(graph):
+    """
+    Returns an array mapping every person index to a dense component
+    id, numbered in order of each component's first person.
+    """
+    n = graph.num_people
+    parent = array("i", range(n))
+    size = array("i", [1]) * n
+
+    # Union every star of a movie with its first star
+    for movie in range(graph.num_movies):
+        stars = graph.stars_of(movie)
+        for person in stars[1:]:
+            union(parent, size, stars[0], person)
+
+    # Relabel the roots densely
+    component = array("i", [-1]) * n
+    roots = {}
+    for person in range(n):
+        root = find(parent, person)
+        component[person] = roots.setdefault(root, len(roots))
+    return component
+
+
+def sizes(component):
+    """Returns a Counter of people per component id."""
+    return Counter(component)
+
+
+def report(component, top=10):
+    """Returns a printable summary of the component sizes."""
+    counts = sizes(component)
+    histogram = Counter(counts.values())
+    lines = [
+        f"{len(component)} people in {len(counts)} components.",
+        f"Largest {min(top, len(counts))} components:",
+    ]
+    for rank, (cid, count) in enumerate(counts.most_common(top), 1):
+        share = count / len(component)
+        lines.append(f"  {rank}. component {cid}: {count} people "
+                     f"({share:.1%})")
+    lines.append("Components by size:")
+    for size, count in sorted(histogram.items(), reverse=True):
+        lines.append(f"  {count} of size {size}")
+    return "\n".join(lines)
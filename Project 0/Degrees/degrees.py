@@ -1,75 +1,284 @@
+import argparse
 import csv
+import io
+import multiprocessing
+import os
 import sys
+import time
 
+import components
+import landmarks
+import snapshot
+from nameindex import NameIndex
+from graph import Graph, bfs, bidirectional_bfs, bipartite_bfs
 from util import Node, StackFrontier, QueueFrontier
 
+# Search strategies accepted by shortest_path
+STRATEGIES = ["bfs", "bidirectional", "bipartite", "astar", "frontier"]
+
 # Maps names to a set of corresponding person_ids
 names = {}
 
 # Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
+# (a snapshot.Table, which builds each dictionary on first use)
 people = {}
 
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
+# (a snapshot.Table, which builds each dictionary on first use)
 movies = {}
 
+# Integer-indexed CSR view of people and movies, built by load_data
+graph = None
+
+# Landmark distance index for the "astar" strategy, if one was built
+landmark_index = None
+
+# Prefix and fuzzy index over the keys of names, see get_name_index
+name_index = None
+
+# Bytes of every CSV file already loaded, see update_data
+loaded_sizes = {}
+
 
-def load_data(directory):
+def load_data(directory, cache=True):
     """
     Load data from CSV files into memory.
+
+    With `cache`, a binary snapshot next to the CSV files is used
+    when it matches them, and is written after parsing otherwise.
     """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
+    global graph, people, movies, landmark_index, name_index
+
+    # The name index is rebuilt from the new names on first use
+    name_index = None
+
+    # Remember how much of every file is loaded, for update_data
+    loaded_sizes.clear()
+    for name in snapshot.SOURCES:
+        loaded_sizes[name] = os.path.getsize(os.path.join(directory, name))
+
+    # Use the landmark index built by landmarks.py, if it is up to date
+    landmark_index = None
+
+    # Use the snapshot if it is up to date with the CSV files
+    if cache:
+        loaded = snapshot.load(directory)
+        if loaded is not None:
+            people, movies, snapshot_names, graph = loaded
+            names.clear()
+            names.update(snapshot_names)
+            landmark_index = landmarks.load(directory, graph)
+            return
+
+    # Parse the files into columns and the graph, without a dict or
+    # set per row; every load starts over, so removed rows are dropped
+    person_ids, (person_names, births) = read_columns(
+        directory, "people.csv", ("name", "birth"))
+    movie_ids, (titles, years) = read_columns(
+        directory, "movies.csv", ("title", "year"))
+    graph = Graph.from_credits(person_ids, movie_ids,
+                               read_credits(directory))
+    graph.component = components.label(graph)
+
+    people, movies, loaded_names = snapshot.tables(
+        graph, person_names, births, titles, years)
+    names.clear()
+    names.update(loaded_names)
+
+    # Save a snapshot for the next run, the directory may be read-only
+    if cache:
+        try:
+            snapshot.save(directory, people, movies, graph)
+        except OSError:
+            pass
 
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
+    landmark_index = landmarks.load(directory, graph)
+
+
+def read_columns(directory, name, fields):
+    """
+    Returns the ids of a CSV file, in order of first appearance, and
+    one list per field of their values. A repeated id keeps its first
+    position and the values of its last row.
+    """
+    index = {}
+    columns = tuple([] for _ in fields)
+    with open(os.path.join(directory, name), encoding="utf-8",
+              newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        key = header.index("id")
+        positions = [header.index(field) for field in fields]
         for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
+            if not row:
+                continue
+            i = index.setdefault(row[key], len(index))
+            if i < len(columns[0]):
+                for column, position in zip(columns, positions):
+                    column[i] = row[position]
+            else:
+                for column, position in zip(columns, positions):
+                    column.append(row[position])
+    return list(index), columns
+
+
+def read_credits(directory):
+    """Yields the (person_id, movie_id) pairs of stars.csv."""
+    with open(os.path.join(directory, "stars.csv"), encoding="utf-8",
+              newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        person = header.index("person_id")
+        movie = header.index("movie_id")
         for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+            if row:
+                yield row[person], row[movie]
+
+
+def update_data(directory):
+    """
+    Loads the rows appended to the CSV files since `load_data` (or
+    the last update) without reloading anything else, and keeps the
+    graph and every derived index up to date.
+
+    Returns the number of people, movies and stars rows applied.
+    """
+    updates = (
+        ("people.csv",
+         lambda row: add_person(row["id"], row["name"], row["birth"])),
+        ("movies.csv",
+         lambda row: add_movie(row["id"], row["title"], row["year"])),
+        ("stars.csv",
+         lambda row: add_star(row["person_id"], row["movie_id"])),
+    )
+    applied = 0
+    for name, apply in updates:
+        for row in appended_rows(directory, name):
+            apply(row)
+            applied += 1
+    return applied
+
+
+def appended_rows(directory, name):
+    """
+    Returns the complete rows appended to a CSV file since it was
+    last read, as dicts keyed by the file's header.
+    """
+    with open(os.path.join(directory, name), "rb") as f:
+        fieldnames = next(csv.reader([f.readline().decode("utf-8")]))
+        offset = loaded_sizes[name]
+        f.seek(0, os.SEEK_END)
+        if f.tell() < offset:
+            raise ValueError(f"{name} shrank since it was loaded, "
+                             "reload it with load_data")
+        f.seek(offset)
+        data = f.read()
+
+    # Leave a partly written last line for the next update
+    data = data[:data.rfind(b"\n") + 1]
+    loaded_sizes[name] = offset + len(data)
+    text = io.StringIO(data.decode("utf-8"), newline="")
+    return list(csv.DictReader(text, fieldnames=fieldnames))
+
+
+def add_person(person_id, name, birth):
+    """
+    Adds a person to the loaded data. Returns False if the
+    person_id is already known.
+    """
+    if person_id in people:
+        return False
+    graph.add_person(person_id)
+    people[person_id] = {"name": name, "birth": birth, "movies": set()}
+
+    key = name.lower()
+    if key not in names:
+        names[key] = set()
+        if name_index is not None:
+            name_index.add(key)
+    names[key].add(person_id)
+
+    if landmark_index is not None:
+        landmark_index.add_person()
+    return True
+
+
+def add_movie(movie_id, title, year):
+    """
+    Adds a movie to the loaded data. Returns False if the
+    movie_id is already known.
+    """
+    if movie_id in movies:
+        return False
+    graph.add_movie(movie_id)
+    movies[movie_id] = {"title": title, "year": year, "stars": set()}
+    return True
+
+
+def add_star(person_id, movie_id):
+    """
+    Records that a person starred in a movie. Returns False if
+    either is unknown or the credit is already recorded.
+    """
+    if person_id not in people or movie_id not in movies:
+        return False
+    person = graph.person_index[person_id]
+    movie = graph.movie_index[movie_id]
+    if not graph.add_star(person, movie):
+        return False
+    people[person_id]["movies"].add(movie_id)
+    movies[movie_id]["stars"].add(person_id)
+
+    if landmark_index is not None:
+        landmark_index.add_links(graph, graph.stars_of(movie))
+    return True
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        description="Find the degrees of separation between two people.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--strategy", default="bfs", choices=STRATEGIES,
+                        help="search strategy passed to shortest_path")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer the source,target pairs of a CSV "
+                             "file (- for stdin) instead of prompting")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes for --batch")
+    parser.add_argument("--stats", action="store_true",
+                        help="print connected component sizes and exit")
+    args = parser.parse_args()
+
+    if args.stats:
+        load_data(args.directory)
+        print(components.report(graph.components()))
+        return
+
+    if args.batch is not None:
+        # Keep stdout clean for the results
+        load_data(args.directory)
+        f = sys.stdin if args.batch == "-" else open(
+            args.batch, encoding="utf-8", newline="")
+        with f:
+            run_batch(csv.reader(f), sys.stdout, args.directory,
+                      args.strategy, args.workers)
+        return
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(args.directory)
     print("Data loaded.")
 
-    source = person_id_for_name(input("Name: "))
+    name = input("Name: ")
+    source = person_id_for_name(name)
     if source is None:
-        sys.exit("Person not found.")
-    target = person_id_for_name(input("Name: "))
+        not_found(name)
+    name = input("Name: ")
+    target = person_id_for_name(name)
     if target is None:
-        sys.exit("Person not found.")
+        not_found(name)
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, args.strategy)
 
     if path is None:
         print("Not connected.")
@@ -84,11 +293,148 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def run_batch(rows, out, directory, strategy="bfs", workers=1):
+    """
+    Answers every (source, target) row and writes one CSV result row
+    per query to `out`, in the order the queries finish.
+
+    Sources and targets may be person ids or unambiguous names. The
+    data must already be loaded; with more than one worker the
+    queries are spread over a process pool. Forked workers share the
+    loaded graph with this process, spawned ones load it again from
+    `directory` (cheap once the snapshot exists).
+    """
+    # Fail before any row is written, not in the first connected query
+    check_strategy(strategy)
+
+    writer = csv.writer(out)
+    writer.writerow(["line", "source", "target", "status",
+                     "degrees", "path", "latency_ms"])
+
+    queries = (
+        (line, strategy, row[0].strip(), row[1].strip())
+        for line, row in enumerate(rows, 1)
+        if len(row) >= 2 and row[:2] != ["source", "target"]
+    )
+
+    if workers <= 1:
+        results = map(answer_query, queries)
+        pool = None
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+            "fork" if "fork" in methods else None)
+        pool = context.Pool(workers, initializer=init_worker,
+                            initargs=(directory,))
+        results = pool.imap_unordered(answer_query, queries, chunksize=16)
+
+    try:
+        for result in results:
+            writer.writerow(result)
+            out.flush()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def init_worker(directory):
+    """Loads the data in a batch worker unless it was inherited."""
+    if graph is None:
+        load_data(directory)
+
+
+def answer_query(query):
+    """
+    Answers one batch query of (line, strategy, source, target) and
+    returns its CSV result row.
+    """
+    line, strategy, source_text, target_text = query
+    start = time.perf_counter()
+
+    source = resolve_person(source_text)
+    target = resolve_person(target_text)
+    if source is None or target is None:
+        missing = source_text if source is None else target_text
+        status = f"unknown or ambiguous person: {missing}"
+        degrees, path = "", ""
+    else:
+        found = shortest_path(source, target, strategy)
+        if found is None:
+            status, degrees, path = "not connected", "", ""
+        else:
+            status, degrees = "ok", len(found)
+            path = " ".join(f"{movie_id}:{person_id}"
+                            for movie_id, person_id in found)
+
+    latency = (time.perf_counter() - start) * 1000
+    return [line, source_text, target_text, status, degrees, path,
+            f"{latency:.3f}"]
+
+
+def resolve_person(text):
+    """
+    Returns the person id for a batch field holding either an id
+    or an unambiguous name, or None.
+    """
+    if text in people:
+        return text
+    person_ids = names.get(text.lower(), set())
+    return next(iter(person_ids)) if len(person_ids) == 1 else None
+
+
+def shortest_path(source, target, strategy="bfs"):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    `strategy` selects the search engine: "bfs" searches outward from
+    the source only, "bidirectional" searches from both ends at once,
+    both over the compact graph built by `load_data`. "bipartite" is a
+    BFS that also marks movies as visited, so each cast is scanned at
+    most once per query. "astar" is an A* search guided by the
+    landmark index (see landmarks.py), or a plain uniform-cost search
+    when no index was built. "frontier" runs the node-and-frontier BFS
+    directly over the `people` and `movies` dicts.
+
+    If no possible path, returns None.
+    """
+    check_strategy(strategy)
+
+    # People in different components are never connected
+    if not graph.connected(graph.person_index[source],
+                           graph.person_index[target]):
+        return None
+
+    if strategy == "frontier":
+        return frontier_search(source, target)
+    elif strategy == "bfs":
+        search = bfs
+    elif strategy == "bidirectional":
+        search = bidirectional_bfs
+    elif strategy == "bipartite":
+        search = bipartite_bfs
+    elif strategy == "astar":
+        def search(graph, source, target):
+            return landmarks.astar(graph, source, target, landmark_index)
+
+    path = search(graph, graph.person_index[source],
+                  graph.person_index[target])
+    return None if path is None else graph.to_ids(path)
+
+
+def check_strategy(strategy):
+    """Raises ValueError unless shortest_path accepts a strategy."""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"unknown search strategy: {strategy}")
+
+
+def frontier_search(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, using a breadth-first
+    search of nodes over a queue frontier.
+
     If no possible path, returns None.
     """
     # The starting node ==> id of the source
@@ -183,6 +529,50 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def not_found(name):
+    """Exits with the closest known names to a name that was not found."""
+    if name.lower() not in names:
+        suggestions = suggest_names(name)
+        if suggestions:
+            print(f"Did you mean: {', '.join(suggestions)}?")
+    sys.exit("Person not found.")
+
+
+def get_name_index():
+    """
+    Returns the prefix and fuzzy index over the loaded names,
+    building it on first use so startup does not pay for it.
+    """
+    global name_index
+    if name_index is None:
+        name_index = NameIndex(names)
+    return name_index
+
+
+def display_name(key):
+    """Returns the name as written in the data for a lowercase name."""
+    person_id = next(iter(names[key]))
+    return people[person_id]["name"]
+
+
+def complete_name(prefix, limit=10):
+    """
+    Returns up to `limit` distinct names starting with a prefix,
+    ignoring case, in alphabetical order.
+    """
+    return [display_name(key)
+            for key in get_name_index().complete(prefix, limit)]
+
+
+def suggest_names(name, limit=5):
+    """
+    Returns up to `limit` distinct names most similar to a possibly
+    misspelled name, best match first.
+    """
+    return [display_name(key)
+            for key, _ in get_name_index().fuzzy(name, limit)]
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
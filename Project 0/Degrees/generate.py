@@ -0,0 +1,127 @@
+"""
+Synthetic IMDb-like dataset generator for Degrees.
+
+Writes people.csv, movies.csv and stars.csv in the format load_data
+reads. Cast sizes and filmography sizes both follow power laws: most
+movies have a handful of stars and a few have huge casts, and stars
+are drawn with Pareto-distributed popularity, so a few people appear
+in a great many movies while most appear in one or two. As on IMDb,
+every person has at least one credit: people the popularity draws
+missed are added to the cast of a random movie.
+
+Usage: python generate.py directory [--people N] [--movies N]
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import random
+from bisect import bisect
+
+FIRST = ["Al", "Ann", "Ben", "Cara", "Dan", "Eva", "Finn", "Gia", "Hal",
+         "Ida", "Jon", "Kim", "Leo", "Mia", "Ned", "Ola", "Pat", "Quin",
+         "Rae", "Sam", "Tess", "Uma", "Vic", "Wes", "Yara", "Zed"]
+SYLLABLES = ["ba", "cor", "del", "fen", "gar", "hol", "ish", "jun", "kel",
+             "lam", "mor", "nov", "ost", "par", "quil", "ros", "sen", "tor",
+             "ul", "ven", "wick", "yor", "zan"]
+WORDS = ["Night", "Return", "Shadow", "Last", "Road", "City", "Fire",
+         "Dream", "Storm", "Secret", "House", "River", "Star", "Silent",
+         "Empire", "Heart", "Winter", "Edge", "Lost", "Garden"]
+
+
+def person_name(rng):
+    """Returns a random name; common combinations repeat at scale."""
+    last = "".join(rng.choices(SYLLABLES, k=rng.randint(2, 3)))
+    return f"{rng.choice(FIRST)} {last.capitalize()}"
+
+
+def movie_title(rng):
+    """Returns a random movie title."""
+    return " ".join(rng.choices(WORDS, k=rng.randint(1, 3)))
+
+
+def cast_size(rng, alpha, smallest, largest):
+    """Returns a power-law distributed cast size between the bounds."""
+    return min(largest, int(smallest * rng.paretovariate(alpha)))
+
+
+def generate(directory, num_people, num_movies, seed=0,
+             cast_alpha=2.0, fame_alpha=1.2,
+             smallest_cast=2, largest_cast=500):
+    """
+    Writes a synthetic dataset to a directory and returns the number
+    of star credits written.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for person in range(1, num_people + 1):
+            writer.writerow([person, person_name(rng),
+                             rng.randint(1900, 2010)])
+
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for movie in range(1, num_movies + 1):
+            writer.writerow([movie, movie_title(rng),
+                             rng.randint(1920, 2020)])
+
+    # Popularity weights, cumulative so each draw is a bisection
+    fame = list(itertools.accumulate(
+        rng.paretovariate(fame_alpha) for _ in range(num_people)))
+    total = fame[-1]
+
+    casts = []
+    for movie in range(num_movies):
+        size = cast_size(rng, cast_alpha, smallest_cast,
+                         min(largest_cast, num_people))
+        stars = set()
+        while len(stars) < size:
+            stars.add(bisect(fame, rng.random() * total) + 1)
+        casts.append(stars)
+
+    # Give everyone the popularity draws missed one credit
+    credited = set().union(*casts)
+    for person in range(1, num_people + 1):
+        if person not in credited and casts:
+            casts[rng.randrange(num_movies)].add(person)
+
+    credits = 0
+    with open(os.path.join(directory, "stars.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie, stars in enumerate(casts, 1):
+            writer.writerows([person, movie] for person in sorted(stars))
+            credits += len(stars)
+
+    return credits
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic Degrees dataset.")
+    parser.add_argument("directory")
+    parser.add_argument("--people", type=int, default=100000)
+    parser.add_argument("--movies", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cast-alpha", type=float, default=2.0,
+                        help="power-law exponent of cast sizes")
+    parser.add_argument("--fame-alpha", type=float, default=1.2,
+                        help="power-law exponent of star popularity")
+    args = parser.parse_args()
+
+    credits = generate(args.directory, args.people, args.movies, args.seed,
+                       args.cast_alpha, args.fame_alpha)
+    print(f"Wrote {args.people} people, {args.movies} movies and "
+          f"{credits} star credits to {args.directory}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""
+Compact graph layer for the Degrees dataset.
+
+People and movies get dense integer indexes, and the bipartite
+person <-> movie relation is stored twice in compressed sparse row
+(CSR) form: `person_movies[person_offsets[p]:person_offsets[p + 1]]`
+are the movies of person `p`, and likewise `movie_stars` for the
+stars of a movie. Every array is a flat `array("i")`.
+
+People, movies and star credits added after the graph was built go
+to small overlay lists instead, since the CSR arrays cannot grow.
+"""
+
+from array import array
+from itertools import accumulate
+
+from components import find
+
+
+class Graph():
+    def __init__(self, person_ids, movie_ids,
+                 person_offsets, person_movies,
+                 movie_offsets, movie_stars,
+                 person_index=None, movie_index=None):
+
+        # Dense index -> IMDb id, and the reverse lookups
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+        if person_index is None:
+            person_index = {pid: i for i, pid in enumerate(person_ids)}
+        if movie_index is None:
+            movie_index = {mid: i for i, mid in enumerate(movie_ids)}
+        self.person_index = person_index
+        self.movie_index = movie_index
+
+        # CSR adjacency in both directions
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+
+        # Component id of every person, see components.label
+        self.component = None
+
+        # Union-find parents over component ids, once components merge
+        self.component_parent = None
+
+        # Links added after the CSR arrays were built
+        self.base_people = len(person_offsets) - 1
+        self.base_movies = len(movie_offsets) - 1
+        self.extra_movies = {}
+        self.extra_stars = {}
+
+    @classmethod
+    def from_credits(cls, person_ids, movie_ids, credits):
+        """
+        Builds the graph from the person and movie IMDb ids and an
+        iterable of (person_id, movie_id) star credits. Credits of
+        unknown ids are skipped, and repeated ones are kept once.
+        """
+        person_index = {pid: i for i, pid in enumerate(person_ids)}
+        movie_index = {mid: i for i, mid in enumerate(movie_ids)}
+        num_people = len(person_ids)
+        num_movies = len(movie_ids)
+
+        # Each credit is one integer, person * num_movies + movie, so
+        # sorting the set groups them by person without a set per row
+        keys = sorted({person_index[pid] * num_movies + movie_index[mid]
+                       for pid, mid in credits
+                       if pid in person_index and mid in movie_index})
+        person_offsets, person_movies = cls.pack(keys, num_movies,
+                                                 num_people)
+
+        # And swapped, movie * num_people + person, to group by movie
+        keys = sorted(movie * num_people + person
+                      for person, movie in (divmod(key, num_movies)
+                                            for key in keys))
+        movie_offsets, movie_stars = cls.pack(keys, num_people, num_movies)
+
+        return cls(person_ids, movie_ids,
+                   person_offsets, person_movies,
+                   movie_offsets, movie_stars,
+                   person_index, movie_index)
+
+    @staticmethod
+    def pack(keys, width, rows):
+        """
+        Packs sorted `row * width + value` keys into CSR offset and
+        value arrays with `rows` rows.
+        """
+        counts = array("i", [0]) * rows
+        for key in keys:
+            counts[key // width] += 1
+        offsets = array("i", accumulate(counts, initial=0))
+        values = array("i", [key % width for key in keys])
+        return offsets, values
+
+    @property
+    def num_people(self):
+        return len(self.person_ids)
+
+    @property
+    def num_movies(self):
+        return len(self.movie_ids)
+
+    def movies_of(self, person):
+        """Returns the movie indexes of a person index."""
+        offsets = self.person_offsets
+        if not self.extra_movies:
+            return self.person_movies[offsets[person]:offsets[person + 1]]
+        return self.linked(person, self.base_people, offsets,
+                           self.person_movies, self.extra_movies)
+
+    def stars_of(self, movie):
+        """Returns the person indexes of a movie index."""
+        offsets = self.movie_offsets
+        if not self.extra_stars:
+            return self.movie_stars[offsets[movie]:offsets[movie + 1]]
+        return self.linked(movie, self.base_movies, offsets,
+                           self.movie_stars, self.extra_stars)
+
+    @staticmethod
+    def linked(i, base, offsets, values, extra):
+        """Returns the CSR row of i followed by its overlay links."""
+        row = values[offsets[i]:offsets[i + 1]] if i < base else ()
+        added = extra.get(i)
+        return row if added is None else [*row, *added]
+
+    def add_person(self, person_id):
+        """Adds a person with no movies and returns its index."""
+        person = len(self.person_ids)
+        self.person_ids.append(person_id)
+        self.person_index[person_id] = person
+        self.extra_movies[person] = []
+        if self.component is not None:
+            parent = self.merging()
+            self.component.append(len(parent))
+            parent.append(len(parent))
+        return person
+
+    def add_movie(self, movie_id):
+        """Adds a movie with no stars and returns its index."""
+        movie = len(self.movie_ids)
+        self.movie_ids.append(movie_id)
+        self.movie_index[movie_id] = movie
+        self.extra_stars[movie] = []
+        return movie
+
+    def add_star(self, person, movie):
+        """
+        Links a person index to a movie index, merging their
+        components. Returns False if they were already linked.
+        """
+        stars = self.stars_of(movie)
+        if person in stars:
+            return False
+        if self.component is not None and len(stars):
+            parent = self.merging()
+            a = find(parent, self.component[person])
+            b = find(parent, self.component[stars[0]])
+            parent[max(a, b)] = min(a, b)
+        self.extra_movies.setdefault(person, []).append(movie)
+        self.extra_stars.setdefault(movie, []).append(person)
+        return True
+
+    def merging(self):
+        """
+        Returns the union-find parents over component ids, switching
+        the labels to a growable array on first use.
+        """
+        if self.component_parent is None:
+            self.component = array("i", self.component)
+            self.component_parent = array(
+                "i", range(max(self.component, default=-1) + 1))
+        return self.component_parent
+
+    def component_of(self, person):
+        """Returns the component id of a person index."""
+        label = self.component[person]
+        if self.component_parent is None:
+            return label
+        return find(self.component_parent, label)
+
+    def components(self):
+        """Returns the component id of every person index."""
+        if self.component_parent is None:
+            return self.component
+        return array("i", map(self.component_of, range(self.num_people)))
+
+    def connected(self, source, target):
+        """
+        Returns False if two person indexes are known to be in
+        different components, True otherwise.
+        """
+        return (self.component is None
+                or self.component_of(source) == self.component_of(target))
+
+    def to_ids(self, path):
+        """
+        Translates a path of (movie, person) indexes into
+        (movie_id, person_id) pairs.
+        """
+        return [(self.movie_ids[movie], self.person_ids[person])
+                for movie, person in path]
+
+
+def bfs(graph, source, target):
+    """
+    Returns the shortest list of (movie, person) index pairs that
+    connect the source index to the target index, or None.
+    """
+    if source == target:
+        return []
+
+    # parent[p] == -1 means person p has not been reached yet
+    parent = array("i", [-1]) * graph.num_people
+    via = array("i", [-1]) * graph.num_people
+    parent[source] = source
+
+    layer = [source]
+    while layer:
+        next_layer = []
+        for person in layer:
+            for movie in graph.movies_of(person):
+                for neighbor in graph.stars_of(movie):
+                    if parent[neighbor] != -1:
+                        continue
+                    parent[neighbor] = person
+                    via[neighbor] = movie
+                    if neighbor == target:
+                        return walk(parent, via, source, target)
+                    next_layer.append(neighbor)
+        layer = next_layer
+
+    return None
+
+
+def bipartite_bfs(graph, source, target):
+    """
+    Returns the shortest list of (movie, person) index pairs that
+    connect the source index to the target index, or None.
+
+    Searches the person <-> movie bipartite graph, marking movies as
+    visited too, so the cast of each movie is scanned at most once
+    instead of once per co-star that reaches it.
+    """
+    if source == target:
+        return []
+
+    parent = array("i", [-1]) * graph.num_people
+    via = array("i", [-1]) * graph.num_people
+    seen = bytearray(graph.num_movies)
+    parent[source] = source
+
+    layer = [source]
+    while layer:
+        next_layer = []
+        for person in layer:
+            for movie in graph.movies_of(person):
+                if seen[movie]:
+                    continue
+                seen[movie] = 1
+                for neighbor in graph.stars_of(movie):
+                    if parent[neighbor] != -1:
+                        continue
+                    parent[neighbor] = person
+                    via[neighbor] = movie
+                    if neighbor == target:
+                        return walk(parent, via, source, target)
+                    next_layer.append(neighbor)
+        layer = next_layer
+
+    return None
+
+
+def bidirectional_bfs(graph, source, target):
+    """
+    Returns the shortest list of (movie, person) index pairs that
+    connect the source index to the target index, expanding
+    breadth-first from both ends until the searches meet, or None.
+    """
+    if source == target:
+        return []
+
+    n = graph.num_people
+    forward = (array("i", [-1]) * n, array("i", [-1]) * n)
+    backward = (array("i", [-1]) * n, array("i", [-1]) * n)
+    forward[0][source] = source
+    backward[0][target] = target
+
+    forward_layer = [source]
+    backward_layer = [target]
+
+    while forward_layer and backward_layer:
+
+        # Always grow the smaller side, it has fewer neighbors to scan
+        if len(forward_layer) <= len(backward_layer):
+            forward_layer, meeting = expand_layer(
+                graph, forward_layer, forward, backward[0])
+        else:
+            backward_layer, meeting = expand_layer(
+                graph, backward_layer, backward, forward[0])
+
+        # The first meeting found is always on a shortest path
+        if meeting is not None:
+            path = walk(*forward, source, meeting)
+            person = meeting
+            parent, via = backward
+            while person != target:
+                path.append((via[person], parent[person]))
+                person = parent[person]
+            return path
+
+    return None
+
+
+def expand_layer(graph, layer, tree, other):
+    """
+    Expands a whole BFS layer, recording (parent, via) links in `tree`.
+
+    Returns the next layer and the first person already reached by
+    the search whose parent array is `other`, or None.
+    """
+    parent, via = tree
+    next_layer = []
+    for person in layer:
+        for movie in graph.movies_of(person):
+            for neighbor in graph.stars_of(movie):
+                if parent[neighbor] != -1:
+                    continue
+                parent[neighbor] = person
+                via[neighbor] = movie
+                if other[neighbor] != -1:
+                    return next_layer, neighbor
+                next_layer.append(neighbor)
+    return next_layer, None
+
+
+def walk(parent, via, source, person):
+    """
+    Follows parent links from a person back to the source and
+    returns the (movie, person) pairs in source-to-person order.
+    """
+    path = []
+    while person != source:
+        path.append((via[person], person))
+        person = parent[person]
+    path.reverse()
+    return path
@@ -0,0 +1,295 @@
+"""
+Landmark (ALT) distance index for goal-directed search in Degrees.
+
+A few high-degree people are picked as landmarks and the BFS
+distance from each of them to every person is stored, one byte per
+person. By the triangle inequality, for any landmark L
+
+    distance(v, t) >= |distance(L, t) - distance(L, v)|
+
+which gives A* an admissible and consistent lower bound, so the
+paths it returns are still shortest paths.
+
+Build the index for a data directory with
+
+    python landmarks.py [directory] [--count N]
+"""
+
+import argparse
+import heapq
+import json
+import mmap
+import os
+import struct
+from array import array
+from collections import deque
+
+import snapshot
+from graph import walk
+
+MAGIC = b"DEGLMRK\0"
+VERSION = 1
+FILENAME = "landmarks.bin"
+PREFIX = struct.Struct("<8sII")
+
+# Distance stored for people a landmark cannot reach
+UNREACHABLE = 255
+
+# Landmarks used per query, picked by how much they bound the source
+ACTIVE = 4
+
+
+class Landmarks():
+    def __init__(self, people, distances):
+
+        # Person index of every landmark, and its distance array
+        self.people = people
+        self.distances = distances
+
+    def active(self, source, target):
+        """
+        Returns the distance arrays of the landmarks giving the best
+        lower bounds between source and target, or None if a landmark
+        shows the two are not connected at all.
+        """
+        scored = []
+        for dist in self.distances:
+            ds, dt = dist[source], dist[target]
+            if (ds == UNREACHABLE) != (dt == UNREACHABLE):
+                return None
+            if ds != UNREACHABLE:
+                scored.append((abs(dt - ds), dist))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [dist for _, dist in scored[:ACTIVE]]
+
+    def add_person(self):
+        """Extends every distance array for a newly added person."""
+        self.writable()
+        for dist in self.distances:
+            dist.append(UNREACHABLE)
+
+    def add_links(self, graph, people):
+        """
+        Lowers the stored distances after new links were added between
+        the given person indexes. Adding links can only shorten
+        distances, so relaxing outward from them keeps every bound
+        exact and the index admissible.
+        """
+        self.writable()
+        for dist in self.distances:
+            relax(graph, dist, people)
+
+    def writable(self):
+        """Copies memory-mapped distance arrays into growable arrays."""
+        if not all(isinstance(dist, array) for dist in self.distances):
+            self.distances = [array("B", dist) for dist in self.distances]
+
+
+def path_for(directory):
+    """Returns the landmark index path for a data directory."""
+    return os.path.join(directory, FILENAME)
+
+
+def distances_from(graph, source):
+    """
+    Returns the BFS distance from a person index to every person,
+    with UNREACHABLE for people in other components.
+    """
+    dist = array("B", [UNREACHABLE]) * graph.num_people
+    dist[source] = 0
+    layer = [source]
+    depth = 0
+    while layer:
+        depth += 1
+        if depth >= UNREACHABLE:
+            raise ValueError("graph too deep for a one-byte landmark index")
+        next_layer = []
+        for person in layer:
+            for movie in graph.movies_of(person):
+                for neighbor in graph.stars_of(movie):
+                    if dist[neighbor] == UNREACHABLE:
+                        dist[neighbor] = depth
+                        next_layer.append(neighbor)
+        layer = next_layer
+    return dist
+
+
+def relax(graph, dist, people):
+    """
+    Propagates shorter distances outward from the given person
+    indexes until no stored distance can be lowered any further.
+    """
+    queue = deque(people)
+    while queue:
+        person = queue.popleft()
+        depth = dist[person] + 1
+        if depth >= UNREACHABLE:
+            continue
+        for movie in graph.movies_of(person):
+            for neighbor in graph.stars_of(movie):
+                if depth < dist[neighbor]:
+                    dist[neighbor] = depth
+                    queue.append(neighbor)
+
+
+def select(graph, count):
+    """
+    Returns the `count` people with the most co-star links, counted
+    as the total cast size of their movies.
+    """
+    cast = [len(graph.stars_of(m)) for m in range(graph.num_movies)]
+    degree = [sum(cast[m] for m in graph.movies_of(p))
+              for p in range(graph.num_people)]
+    return heapq.nlargest(count, range(graph.num_people),
+                          key=degree.__getitem__)
+
+
+def build(graph, count=32):
+    """Builds a landmark index over the `count` highest-degree people."""
+    people = select(graph, count)
+    return Landmarks(people, [distances_from(graph, p) for p in people])
+
+
+def save(directory, graph, landmarks):
+    """
+    Writes a landmark index next to the CSV files, keyed like the
+    snapshot so a stale index is never used.
+    """
+    header = json.dumps({
+        "sources": snapshot.source_key(directory),
+        "people": graph.num_people,
+        "landmarks": [graph.person_ids[p] for p in landmarks.people],
+    }).encode("utf-8")
+
+    path = path_for(directory)
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, "wb") as f:
+        f.write(PREFIX.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for dist in landmarks.distances:
+            dist.tofile(f)
+    os.replace(temp, path)
+
+
+def load(directory, graph):
+    """
+    Memory-maps the landmark index of a data directory.
+
+    Returns a Landmarks, or None if there is no index matching the
+    current CSV files.
+    """
+    try:
+        with open(path_for(directory), "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        key = snapshot.source_key(directory)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        magic, version, size = PREFIX.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            return None
+        offset = PREFIX.size
+        header = json.loads(buffer[offset:offset + size])
+        n = header["people"]
+        if header["sources"] != key or n != graph.num_people:
+            return None
+        offset += size
+        people = [graph.person_index[pid] for pid in header["landmarks"]]
+    except (struct.error, ValueError, KeyError):
+        return None
+
+    if offset + len(people) * n > len(buffer):
+        return None
+    view = memoryview(buffer)
+    distances = [view[offset + i * n:offset + (i + 1) * n]
+                 for i in range(len(people))]
+    return Landmarks(people, distances)
+
+
+def astar(graph, source, target, landmarks=None):
+    """
+    Returns the shortest list of (movie, person) index pairs that
+    connect the source index to the target index, or None.
+
+    A* over people with unit-cost links, guided by the landmark lower
+    bounds. Without landmarks the bound is zero and this is a plain
+    uniform-cost search.
+    """
+    if source == target:
+        return []
+
+    active = []
+    if landmarks is not None:
+        active = landmarks.active(source, target)
+        if active is None:
+            return None
+    bounds = [(dist, dist[target]) for dist in active]
+
+    def heuristic(person):
+        best = 0
+        for dist, to_target in bounds:
+            d = dist[person]
+            if d == UNREACHABLE:
+                return None
+            best = max(best, abs(to_target - d))
+        return best
+
+    n = graph.num_people
+    cost = array("i", [-1]) * n
+    parent = array("i", [-1]) * n
+    via = array("i", [-1]) * n
+    closed = bytearray(n)
+    cost[source] = 0
+    parent[source] = source
+
+    # Ties on f go to the deepest person, which is closest to the target
+    heap = [(heuristic(source) or 0, 0, source)]
+    while heap:
+        _, depth, person = heapq.heappop(heap)
+        g = -depth
+        if closed[person] or g != cost[person]:
+            continue
+        if person == target:
+            return walk(parent, via, source, target)
+        closed[person] = 1
+
+        g += 1
+        for movie in graph.movies_of(person):
+            for neighbor in graph.stars_of(movie):
+                if closed[neighbor]:
+                    continue
+                if cost[neighbor] != -1 and cost[neighbor] <= g:
+                    continue
+                h = heuristic(neighbor)
+                if h is None:
+                    continue
+                cost[neighbor] = g
+                parent[neighbor] = person
+                via[neighbor] = movie
+                heapq.heappush(heap, (g + h, -g, neighbor))
+
+    return None
+
+
+def main():
+    import degrees
+
+    parser = argparse.ArgumentParser(
+        description="Build the landmark index for a Degrees data directory.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--count", type=int, default=32,
+                        help="number of landmarks")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    degrees.load_data(args.directory)
+    print("Building landmarks...")
+    landmarks = build(degrees.graph, args.count)
+    save(args.directory, degrees.graph, landmarks)
+    print(f"Wrote {len(landmarks.people)} landmarks to "
+          f"{path_for(args.directory)}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Prefix and fuzzy lookup index over the lowercase names of Degrees.
+
+Prefix completion bisects a sorted list of names. Fuzzy matching uses
+a trigram index: the query's trigrams are looked up rarest first,
+the names sharing the most of them are scored by their Dice overlap
+with the query, and the best few are re-ranked with difflib.
+
+Posting lists are always scanned whole, so the matches never depend
+on the order names were added in. The rarest few lists are always
+scanned, and further ones only while the total stays within a budget:
+the longest lists belong to trigrams most names share, which tell
+little about a match, and skipping them bounds the latency on large
+datasets. An exact match is always a candidate.
+"""
+
+import heapq
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from difflib import SequenceMatcher
+from operator import itemgetter
+
+# Most postings scanned for a single fuzzy query, beyond the rarest lists
+BUDGET = 15000
+
+# Rarest posting lists scanned whatever their length. A name one edit
+# away from the query lacks at most three of the query's trigrams, so
+# it is in at least one of these lists
+RAREST = 4
+
+# Names sharing the most trigrams, scored by their exact Dice overlap
+CANDIDATES = 150
+
+# Candidates re-ranked with difflib after trigram scoring
+SHORTLIST = 10
+
+
+def trigrams(name):
+    """Returns the set of trigrams of a name, padded at both ends."""
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex():
+    def __init__(self, names=()):
+
+        # Names by insertion order, which the postings refer to
+        self.keys = []
+
+        # Names in sorted order, for prefix completion
+        self.sorted = []
+
+        # Maps a trigram to the positions of the names containing it
+        self.postings = {}
+
+        for name in names:
+            self.add(name, keep_sorted=False)
+        self.sorted.sort()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, name, keep_sorted=True):
+        """Adds a lowercase name to the index."""
+        position = len(self.keys)
+        grams = trigrams(name)
+        self.keys.append(name)
+        if keep_sorted:
+            insort(self.sorted, name)
+        else:
+            self.sorted.append(name)
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is None:
+                self.postings[gram] = array("i", [position])
+            else:
+                posting.append(position)
+
+    def complete(self, prefix, limit=10):
+        """Returns up to `limit` names starting with a prefix, in order."""
+        prefix = prefix.lower()
+        matches = []
+        i = bisect_left(self.sorted, prefix)
+        while (i < len(self.sorted) and len(matches) < limit
+               and self.sorted[i].startswith(prefix)):
+            matches.append(self.sorted[i])
+            i += 1
+        return matches
+
+    def fuzzy(self, query, limit=5):
+        """
+        Returns up to `limit` (name, score) pairs for the names most
+        similar to a query, best first, with scores between 0 and 1.
+        """
+        query = query.lower().strip()
+        grams = trigrams(query)
+
+        # Count shared trigrams over whole posting lists, rarest first,
+        # stopping at the first list beyond the RAREST that would take
+        # the scan past BUDGET postings
+        shared = Counter()
+        scanned = 0
+        ordered = sorted((self.postings[gram] for gram in grams
+                          if gram in self.postings), key=len)
+        for rank, posting in enumerate(ordered):
+            if rank >= RAREST and scanned + len(posting) > BUDGET:
+                break
+            shared.update(posting)
+            scanned += len(posting)
+
+        # The names sharing the most trigrams are candidates, and so is
+        # the query itself if it is a name
+        shortlist = max(SHORTLIST, limit)
+        candidates = {self.keys[position] for position, _ in heapq.nlargest(
+            max(CANDIDATES, 4 * shortlist), shared.items(),
+            key=itemgetter(1))}
+        i = bisect_left(self.sorted, query)
+        if i < len(self.sorted) and self.sorted[i] == query:
+            candidates.add(query)
+
+        # Score them by their exact Dice overlap, since the counts leave
+        # out the skipped lists, then re-rank the best of them with difflib
+        dice = heapq.nlargest(shortlist, (
+            (2 * len(grams & other) / (len(grams) + len(other)), name)
+            for name, other in ((name, trigrams(name)) for name in candidates)
+        ))
+        ranked = []
+        for overlap, name in dice:
+            ratio = SequenceMatcher(None, query, name).ratio()
+            ranked.append(((overlap + ratio) / 2, name))
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return [(name, score) for score, name in ranked[:limit]]
@@ -0,0 +1,232 @@
+"""
+Binary snapshot cache for the Degrees dataset.
+
+A snapshot is written next to the CSV files and holds everything
+`load_data` builds: the people and movie columns as JSON, followed
+by the four CSR arrays of the graph and its component labels. On
+later runs the file is memory-mapped and the arrays are used in
+place, so the graph costs no parsing and shares pages with the OS
+file cache. Nothing in the file is unpickled or otherwise run, so a
+snapshot that came with a dataset is safe to load.
+
+Layout:
+
+    magic        8 bytes, b"DEGSNAP\\0"
+    version      uint32, little-endian
+    header size  uint32, little-endian
+    header       JSON: source key, column size, byte order and
+                 array lengths
+    columns      JSON list of the id/name/birth/title/year lists
+    arrays       person_offsets, person_movies, movie_offsets,
+                 movie_stars, component as int32 in the byte order
+                 of the machine that wrote them, each aligned to 8
+                 bytes
+
+The source key records the size and mtime of every CSV file, and a
+snapshot whose key, version or byte order does not match is ignored
+and rebuilt.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+
+from graph import Graph
+
+MAGIC = b"DEGSNAP\0"
+VERSION = 3
+FILENAME = "degrees.snapshot"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+PREFIX = struct.Struct("<8sII")
+ALIGN = 8
+
+
+class Table(Mapping):
+    """
+    Mapping from IMDb id to a record dict, backed by the name, birth,
+    title or year columns and the graph instead of one dict per row.
+    Records are built on first access and kept, so they behave like
+    plain dicts of name, birth and movies (or title, year and stars).
+
+    Existing records cannot be replaced or removed; records for ids
+    added to the graph afterwards are set with `table[key] = record`.
+    """
+
+    def __init__(self, ids, index, columns, link, linked):
+        self.ids = ids
+        self.index = index
+        self.columns = columns
+        self.link = link
+        self.linked = linked
+        self.records = {}
+
+        # Rows of the columns, the ids after them were added later
+        self.saved = len(ids)
+
+    def __getitem__(self, key):
+        record = self.records.get(key)
+        if record is None:
+            i = self.index[key]
+            record = {field: values[i]
+                      for field, values in self.columns.items()}
+            record[self.link] = self.linked(i)
+            self.records[key] = record
+        return record
+
+    def __setitem__(self, key, record):
+        if key not in self.index:
+            raise KeyError(f"{key} must be added to the graph first")
+        if key in self.records or self.index[key] < self.saved:
+            raise KeyError(f"{key} is already in the table")
+        self.records[key] = record
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def path_for(directory):
+    """Returns the snapshot path for a data directory."""
+    return os.path.join(directory, FILENAME)
+
+
+def source_key(directory):
+    """
+    Returns the size and mtime of every source CSV, which a snapshot
+    must match to be used.
+    """
+    key = {}
+    for name in SOURCES:
+        stat = os.stat(os.path.join(directory, name))
+        key[name] = [stat.st_size, stat.st_mtime_ns]
+    return key
+
+
+def save(directory, people, movies, graph):
+    """
+    Writes a snapshot of the loaded data next to the CSV files.
+    The file is written under a temporary name and renamed into
+    place, so readers never see a partial snapshot.
+    """
+    columns = json.dumps((
+        graph.person_ids,
+        people.columns["name"],
+        people.columns["birth"],
+        graph.movie_ids,
+        movies.columns["title"],
+        movies.columns["year"],
+    ), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    arrays = [array("i", values) for values in (
+        graph.person_offsets, graph.person_movies,
+        graph.movie_offsets, graph.movie_stars, graph.component
+    )]
+    header = json.dumps({
+        "sources": source_key(directory),
+        "columns": len(columns),
+        "itemsize": arrays[0].itemsize,
+        "byteorder": sys.byteorder,
+        "arrays": [len(values) for values in arrays],
+    }).encode("utf-8")
+
+    path = path_for(directory)
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, "wb") as f:
+        f.write(PREFIX.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        f.write(columns)
+        for values in arrays:
+            f.write(bytes(-f.tell() % ALIGN))
+            values.tofile(f)
+    os.replace(temp, path)
+
+
+def load(directory):
+    """
+    Memory-maps the snapshot of a data directory.
+
+    Returns (people, movies, names, graph), or None if there is no
+    usable snapshot for the current CSV files.
+    """
+    try:
+        with open(path_for(directory), "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        key = source_key(directory)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        magic, version, size = PREFIX.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            return None
+        offset = PREFIX.size
+        header = json.loads(buffer[offset:offset + size])
+        if (header["sources"] != key or header["itemsize"] != 4
+                or header["byteorder"] != sys.byteorder):
+            return None
+        offset += size
+
+        (person_ids, person_names, births,
+         movie_ids, titles, years) = json.loads(
+            buffer[offset:offset + header["columns"]])
+        offset += header["columns"]
+
+        # Columns and arrays that disagree would break later lookups
+        num_people, num_movies = len(person_ids), len(movie_ids)
+        lengths = header["arrays"]
+        if ({len(person_names), len(births)} != {num_people}
+                or {len(titles), len(years)} != {num_movies}
+                or len(lengths) != 5
+                or lengths[0] != num_people + 1
+                or lengths[2] != num_movies + 1
+                or lengths[4] != num_people):
+            return None
+
+        view = memoryview(buffer)
+        arrays = []
+        for length in header["arrays"]:
+            offset += -offset % ALIGN
+            end = offset + length * 4
+            if end > len(buffer):
+                return None
+            arrays.append(view[offset:end].cast("i"))
+            offset = end
+    except (struct.error, ValueError, KeyError, TypeError):
+        return None
+
+    graph = Graph(person_ids, movie_ids, *arrays[:4])
+    graph.component = arrays[4]
+    return (*tables(graph, person_names, births, titles, years), graph)
+
+
+def tables(graph, person_names, births, titles, years):
+    """
+    Returns (people, movies, names) for a graph and the columns of
+    its people and movies, in the graph's index order.
+    """
+    person_ids = graph.person_ids
+    movie_ids = graph.movie_ids
+    people = Table(
+        person_ids, graph.person_index,
+        {"name": person_names, "birth": births}, "movies",
+        lambda i: {movie_ids[m] for m in graph.movies_of(i)}
+    )
+    movies = Table(
+        movie_ids, graph.movie_index,
+        {"title": titles, "year": years}, "stars",
+        lambda i: {person_ids[p] for p in graph.stars_of(i)}
+    )
+
+    names = {}
+    for pid, name in zip(person_ids, person_names):
+        names.setdefault(name.lower(), set()).add(pid)
+    return people, movies, names
@@ -0,0 +1,151 @@
+"""
+Headless benchmark for the Tic Tac Toe player.
+
+Counts the positions reachable from the initial state, perft style,
+once through tictactoe.py's actions/result/terminal and once on the
+bitboard engine, and reports positions per second for each. Then
+times full games of the AI against itself.
+
+Usage: python benchmark.py [--depth N] [--games N] [--size N]
+                           [--win N] [--json]
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+import book
+import tictactoe as ttt
+
+# Default perft depth beyond 3 x 3, where the full tree is out of reach
+LARGE_DEPTH = 4
+
+
+def perft(board, depth):
+    """Returns the number of positions up to `depth` plies from a board."""
+    if depth == 0 or ttt.terminal(board):
+        return 1
+    return 1 + sum(perft(ttt.result(board, action), depth - 1)
+                   for action in ttt.actions(board))
+
+
+def perft_bits(game, xs, os, depth):
+    """Like perft, on the bitboards of a position."""
+    if depth == 0 or game.terminal(xs, os):
+        return 1
+    return 1 + sum(perft_bits(game, *game.play(xs, os, cell), depth - 1)
+                   for cell in game.moves(xs, os))
+
+
+def time_perft(depth):
+    """Returns perft counts and rates from the initial state."""
+    board = ttt.initial_state()
+    results = {}
+    for name, count in (
+        ("api", lambda: perft(board, depth)),
+        ("bitboard", lambda: perft_bits(ttt.game(board), 0, 0, depth)),
+    ):
+        start = time.perf_counter()
+        positions = count()
+        seconds = time.perf_counter() - start
+        results[name] = {"positions": positions, "seconds": seconds,
+                         "positions_per_s": positions / seconds}
+    return results
+
+
+def self_play():
+    """Plays one AI-vs-AI game, returning its move times and result."""
+    board = ttt.initial_state()
+    moves = []
+    start = time.perf_counter()
+    while not ttt.terminal(board):
+        move_start = time.perf_counter()
+        action = ttt.minimax(board)
+        moves.append((time.perf_counter() - move_start) * 1000)
+        board = ttt.result(board, action)
+    return {
+        "seconds": time.perf_counter() - start,
+        "moves": moves,
+        "winner": ttt.winner(board),
+    }
+
+
+def time_games(count):
+    """Returns statistics over `count` AI-vs-AI games."""
+    games = [self_play() for _ in range(count)]
+    moves = [ms for game in games for ms in game["moves"]]
+    return {
+        "games": count,
+        "mean_game_s": statistics.fmean(g["seconds"] for g in games),
+        "mean_move_ms": statistics.fmean(moves),
+        "max_move_ms": max(moves),
+        "first_move_ms": statistics.fmean(g["moves"][0] for g in games),
+        "winners": [g["winner"] for g in games],
+    }
+
+
+def run(depth, games, use_book):
+    """Runs every measurement and returns the results as a dict."""
+    results = {"size": ttt.SIZE, "win": ttt.WIN,
+               "time_limit": ttt.TIME_LIMIT}
+
+    # An empty book makes minimax search every move
+    ttt.opening_book = None if use_book else {}
+    results["book"] = ((ttt.SIZE, ttt.WIN) == (book.SIZE, book.WIN)
+                       and bool(ttt.get_book()))
+
+    results["perft"] = time_perft(depth)
+    results["perft"]["depth"] = depth
+    results["self_play"] = time_games(games)
+    return results
+
+
+def report(results):
+    """Returns a printable table of benchmark results."""
+    perft = results["perft"]
+    book = "with book" if results["book"] else "no book"
+    lines = [f"{results['size']}x{results['size']}, {results['win']} "
+             f"in a row, perft depth {perft['depth']}"]
+    for name in ("api", "bitboard"):
+        row = perft[name]
+        lines.append(f"  perft {name:<9}{row['positions']:>10} positions "
+                     f"{row['seconds']:>8.3f} s "
+                     f"{row['positions_per_s']:>12,.0f}/s")
+    games = results["self_play"]
+    lines.append(f"  self-play ({book}): {games['games']} games, "
+                 f"{games['mean_game_s']:.3f} s per game")
+    lines.append(f"  move ms: mean {games['mean_move_ms']:.3f}, "
+                 f"first {games['first_move_ms']:.3f}, "
+                 f"max {games['max_move_ms']:.3f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Tic Tac Toe player.")
+    parser.add_argument("--depth", type=int, default=None,
+                        help="perft depth in plies (default: 9 on 3x3, "
+                             f"{LARGE_DEPTH} on larger boards)")
+    parser.add_argument("--games", type=int, default=5,
+                        help="number of AI-vs-AI games")
+    parser.add_argument("--size", type=int, default=3)
+    parser.add_argument("--win", type=int, default=None)
+    parser.add_argument("--time-limit", type=float, default=1.0,
+                        help="seconds per move on boards larger than 3x3")
+    parser.add_argument("--no-book", action="store_true",
+                        help="search every move instead of using book.bin")
+    parser.add_argument("--json", action="store_true",
+                        help="print the results as JSON")
+    args = parser.parse_args()
+
+    ttt.configure(args.size, args.win, args.time_limit)
+    depth = args.depth
+    if depth is None:
+        depth = 9 if args.size ** 2 <= ttt.EXACT_CELLS else LARGE_DEPTH
+    results = run(depth, args.games, not args.no_book)
+    print(json.dumps(results, indent=2) if args.json else report(results))
+
+
+if __name__ == "__main__":
+    main()
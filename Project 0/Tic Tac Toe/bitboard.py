@@ -0,0 +1,575 @@
+"""
+Bitboard engine for k-in-a-row games on an N x N board.
+
+A position is a pair of masks (xs, os), one per player, where bit
+N * i + j stands for cell (i, j). Whose turn it is comes from the
+popcounts, and lines are found with shifts (or, on boards of up to
+9 cells, a table over every mask).
+
+The search is a negamax with alpha-beta pruning and a transposition
+table. Positions beyond the search depth are scored by a heuristic
+over the open lines, and a search can be given a wall-clock budget,
+under which it deepens one ply at a time and the deepest completed
+iteration is used. Small boards are searched to the end of the game
+in a single pass, so their results are exact.
+
+A search can also spread its root moves over a process pool (see
+Workers), and picks the same move as the serial search would.
+"""
+
+import math
+import multiprocessing
+import time
+
+# Score of a lost position for the player to move; a win found n plies
+# ahead scores WIN - n, so quicker wins are preferred
+WIN = 1000000
+
+# Scores beyond this are won or lost, heuristic scores stay well below
+DECIDED = WIN // 2
+
+# Kinds of values stored in the transposition table
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Boards with at most this many cells use whole-mask lookup tables
+TABLE_CELLS = 9
+
+# Most transposition entries kept on boards beyond TABLE_CELLS, whose
+# games cannot be searched to the end; the table starts over when full
+TABLE_ENTRIES = 200000
+
+# Nodes searched between two clock checks
+CHECK_EVERY = 1024
+
+# Counters of the last search, see Game.alphabeta, search and exhaustive
+stats = {"nodes": 0, "depth": 0}
+
+# Stands for "no root score yet" in the shared alpha of a parallel search
+NO_SCORE = -2 * WIN
+
+# Seconds between checks of the clock and `stop` while the root cells
+# of a parallel search are out on the pool
+POLL = 0.01
+
+# Best root score of the running parallel search, and the event that
+# cancels it, set in each worker
+shared_alpha = None
+shared_stop = None
+
+if hasattr(int, "bit_count"):
+    popcount = int.bit_count
+else:
+    def popcount(m):
+        return bin(m).count("1")
+
+
+class Timeout(Exception):
+    """Raised inside a search when it runs out of time or is stopped."""
+
+
+def age(score):
+    """Moves a won or lost score one ply further away."""
+    if score > DECIDED:
+        return score - 1
+    if score < -DECIDED:
+        return score + 1
+    return score
+
+
+def unage(score):
+    """Inverse of age, for passing search windows down one ply."""
+    if score > DECIDED:
+        return score + 1
+    if score < -DECIDED:
+        return score - 1
+    return score
+
+
+class Game():
+    def __init__(self, size=3, k=3):
+        if not 1 <= k <= size:
+            raise ValueError("win length must be between 1 and the size")
+        self.size = size
+        self.k = k
+        self.cells = size * size
+        self.full = (1 << self.cells) - 1
+
+        # Every line of k cells, and for each direction the cells a line
+        # can start from, so that shifted runs never wrap around a row
+        self.wins = []
+        self.runs = []
+        for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            starts = 0
+            for i in range(size):
+                for j in range(size):
+                    end_i, end_j = i + (k - 1) * di, j + (k - 1) * dj
+                    if 0 <= end_i < size and 0 <= end_j < size:
+                        starts |= self.bit(i, j)
+                        self.wins.append(sum(
+                            self.bit(i + t * di, j + t * dj)
+                            for t in range(k)))
+            self.runs.append((di * size + dj, starts))
+
+        # Cells that attack the most lines first, nearest the center next
+        lines = [sum(w >> cell & 1 for w in self.wins)
+                 for cell in range(self.cells)]
+        middle = (size - 1) / 2
+        self.order = sorted(range(self.cells), key=lambda cell: (
+            -lines[cell],
+            abs(cell // size - middle) + abs(cell % size - middle),
+            cell
+        ))
+
+        # Masks that keep horizontal shifts from wrapping around rows
+        first = sum(self.bit(i, 0) for i in range(size))
+        last = sum(self.bit(i, size - 1) for i in range(size))
+        self.not_first = self.full & ~first
+        self.not_last = self.full & ~last
+
+        # Lookup tables for small boards
+        self.winning = None
+        self.symmetries = None
+        if self.cells <= TABLE_CELLS:
+            self.winning = bytes(self.scan(m) for m in range(self.full + 1))
+            self.symmetries = [
+                [self.permute(m, cells) for m in range(self.full + 1)]
+                for cells in self.symmetric_cells()
+            ]
+
+        # Heuristic weight of an open line holding n of a player's cells
+        self.weights = [0] + [10 ** n for n in range(1, k)]
+
+        # Maps position keys to (depth, kind, value) entries, where the
+        # value is for the player to move. Small boards share it across
+        # every search; larger ones start one per search, see store
+        self.transposition = {}
+        self.bounded = self.cells > TABLE_CELLS
+
+        # Clock time and event that interrupt the running search
+        self.deadline = None
+        self.stop = None
+
+    def bit(self, i, j):
+        """Returns the mask of cell (i, j)."""
+        return 1 << (self.size * i + j)
+
+    def symmetric_cells(self):
+        """
+        Returns the 8 rotations and reflections of the board, each as
+        the cell to read for every cell of the transformed board.
+        """
+        n = self.size - 1
+        maps = (
+            lambda i, j: (i, j), lambda i, j: (n - j, i),
+            lambda i, j: (n - i, n - j), lambda i, j: (j, n - i),
+            lambda i, j: (i, n - j), lambda i, j: (n - i, j),
+            lambda i, j: (j, i), lambda i, j: (n - j, n - i),
+        )
+        return [[self.size * a + b
+                 for a, b in (f(i, j) for i in range(self.size)
+                              for j in range(self.size))]
+                for f in maps]
+
+    @staticmethod
+    def permute(m, cells):
+        """Moves bit cells[c] of a mask to bit c."""
+        return sum(1 << c for c, cell in enumerate(cells) if m >> cell & 1)
+
+    def scan(self, m):
+        """Returns True if a mask holds a complete line, using shifts."""
+        k = self.k
+        for step, starts in self.runs:
+            run = m & starts
+            for t in range(1, k):
+                if not run:
+                    break
+                run &= m >> (t * step)
+            if run:
+                return True
+        return False
+
+    def has_line(self, m):
+        """Returns True if a mask holds a complete line."""
+        if self.winning is not None:
+            return bool(self.winning[m])
+        return self.scan(m)
+
+    def x_to_move(self, xs, os):
+        """Returns True if X is to move, whether or not the game is over."""
+        return popcount(xs) == popcount(os)
+
+    def winner(self, xs, os):
+        """Returns 1 if X has a line, -1 if O has one, 0 otherwise."""
+        if self.has_line(xs):
+            return 1
+        if self.has_line(os):
+            return -1
+        return 0
+
+    def terminal(self, xs, os):
+        """Returns True if a player has a line or the board is full."""
+        return (xs | os == self.full or self.has_line(xs)
+                or self.has_line(os))
+
+    def moves(self, xs, os):
+        """Returns every empty cell, best candidates first."""
+        taken = xs | os
+        return [cell for cell in self.order if not taken >> cell & 1]
+
+    def candidates(self, xs, os):
+        """
+        Returns the empty cells worth searching, best first. On boards
+        larger than 3 x 3 these are the cells within two steps of a
+        taken cell, since far-away moves neither make nor block lines.
+        """
+        taken = xs | os
+        if self.size <= 3 or not taken:
+            return self.moves(xs, os)
+        near = self.grow(self.grow(taken)) & ~taken
+        return [cell for cell in self.order if near >> cell & 1]
+
+    def grow(self, m):
+        """Returns a mask with every cell next to one of its cells added."""
+        size = self.size
+        m |= (m << 1) & self.not_first | (m >> 1) & self.not_last
+        return (m | m << size | m >> size) & self.full
+
+    def play(self, xs, os, cell):
+        """Returns the position after the player to move takes a cell."""
+        if self.x_to_move(xs, os):
+            return xs | 1 << cell, os
+        return xs, os | 1 << cell
+
+    def key(self, xs, os):
+        """
+        Returns the transposition key of a position. On small boards
+        this is the same for all rotations and reflections.
+        """
+        if self.symmetries is None:
+            return xs << self.cells | os
+        cells = self.cells
+        return min(table[xs] << cells | table[os]
+                   for table in self.symmetries)
+
+    def evaluate(self, xs, os):
+        """
+        Returns a heuristic score for the player to move: open lines
+        count for whoever holds cells on them, more cells much more.
+        """
+        weights = self.weights
+        score = 0
+        for w in self.wins:
+            x, o = xs & w, os & w
+            if x and not o:
+                score += weights[popcount(x)]
+            elif o and not x:
+                score -= weights[popcount(o)]
+        return score if self.x_to_move(xs, os) else -score
+
+    def negamax(self, xs, os, depth, alpha, beta):
+        """
+        Returns the value of a position for the player to move,
+        searched `depth` plies deep with alpha-beta pruning in the
+        (alpha, beta) window.
+        """
+        stats["nodes"] += 1
+        if stats["nodes"] % CHECK_EVERY == 0 and self.interrupted():
+            raise Timeout()
+
+        # Searching at least as deep as there are empty cells reaches the
+        # end of every line, so the value is the exact game value at any
+        # such depth; it is searched and stored at infinite depth, like
+        # finished games, and reused across moves and games
+        if depth >= self.cells - popcount(xs | os):
+            depth = math.inf
+
+        # Only entries of the same depth are used, so a value never
+        # depends on the order positions were searched in; a parallel
+        # search relies on this to agree with the serial one
+        key = self.key(xs, os)
+        entry = self.transposition.get(key)
+        if entry is not None and entry[0] == depth:
+            _, kind, score = entry
+            if kind == EXACT:
+                return score
+            elif kind == LOWER:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if alpha >= beta:
+                return score
+
+        # A line can only belong to the player who just moved, and a
+        # finished game has the same value at any depth
+        if self.has_line(os if self.x_to_move(xs, os) else xs):
+            self.store(key, (math.inf, EXACT, -WIN))
+            return -WIN
+        if xs | os == self.full:
+            self.store(key, (math.inf, EXACT, 0))
+            return 0
+
+        if depth == 0:
+            score = self.evaluate(xs, os)
+            self.store(key, (0, EXACT, score))
+            return score
+
+        original_alpha = alpha
+        score = -math.inf
+        for cell in self.candidates(xs, os):
+            child = -self.negamax(*self.play(xs, os, cell), depth - 1,
+                                  -unage(beta), -unage(alpha))
+            score = max(score, age(child))
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if score <= original_alpha:
+            kind = UPPER
+        elif score >= beta:
+            kind = LOWER
+        else:
+            kind = EXACT
+        self.store(key, (depth, kind, score))
+        return score
+
+    def store(self, key, entry):
+        """
+        Stores a transposition entry. On large boards the table is
+        emptied once it holds TABLE_ENTRIES, which keeps memory bounded;
+        values only depend on the position, so this never changes them.
+        """
+        if self.bounded and len(self.transposition) >= TABLE_ENTRIES:
+            self.transposition.clear()
+        self.transposition[key] = entry
+
+    def interrupted(self):
+        """Returns True once the search is out of time or stopped."""
+        if self.stop is not None and self.stop.is_set():
+            return True
+        return (self.deadline is not None
+                and time.perf_counter() > self.deadline)
+
+    def root(self, xs, os, depth, cells):
+        """
+        Searches every root cell `depth` plies deep, in the given
+        order. Returns (cell, score) for the first best cell, with
+        the score for the player to move.
+        """
+        best_cell, alpha = None, -math.inf
+        for cell in cells:
+            child = -self.negamax(*self.play(xs, os, cell), depth - 1,
+                                  -math.inf, -unage(alpha))
+            score = age(child)
+            if best_cell is None or score > alpha:
+                best_cell, alpha = cell, score
+
+            # Nothing beats the quickest possible win
+            if alpha >= WIN - 1:
+                break
+        return best_cell, alpha
+
+    def parallel_root(self, xs, os, depth, cells, workers):
+        """
+        Like root, with every root cell searched as a separate task on
+        a Workers pool. Each task narrows its window to the best score
+        found so far minus one, which still scores ties exactly, so the
+        first best cell in order is the one root would pick.
+
+        Tasks get the seconds left rather than the deadline, as clocks
+        are not comparable across processes. When the time is up or
+        `stop` is set, the workers are stopped and every task is waited
+        for, so none is still running when the next search starts.
+        """
+        workers.alpha.value = NO_SCORE
+        workers.stop.clear()
+        remaining = (None if self.deadline is None
+                     else self.deadline - time.perf_counter())
+        tasks = [(self.size, self.k, xs, os, depth, cell, remaining)
+                 for cell in cells]
+        results = workers.pool.imap(search_root_cell, tasks)
+        best_cell, alpha = None, -math.inf
+        for _ in tasks:
+            while True:
+                try:
+                    cell, score, nodes = results.next(POLL)
+                    break
+                except multiprocessing.TimeoutError:
+                    if self.interrupted():
+                        workers.stop.set()
+            stats["nodes"] += nodes
+            if score is None:
+                workers.stop.set()
+            elif best_cell is None or score > alpha:
+                best_cell, alpha = cell, score
+        if workers.stop.is_set():
+            raise Timeout()
+        return best_cell, alpha
+
+    def search(self, xs, os, depth=None, time_limit=None, stop=None,
+               workers=None):
+        """
+        Returns (cell, score) for the player to move, searched `depth`
+        plies deep (by default to the end of the game). With a
+        `time_limit` in seconds, the search deepens one ply at a time
+        instead and stops when the time runs out. The score is for X:
+        above DECIDED when X wins, below -DECIDED when O does. The cell
+        is None on a finished board. The deepest completed depth is
+        left in stats["depth"].
+
+        `stop` is an optional threading.Event; setting it from another
+        thread ends the search early, and its result should be ignored.
+        With a Workers pool the root cells are searched in parallel.
+        """
+        stats["nodes"] = 1
+        stats["depth"] = 0
+        if self.terminal(xs, os):
+            return None, self.winner(xs, os) * WIN
+
+        # Entries from earlier moves of a large board are rarely reached
+        # again, so they are dropped rather than kept for the whole game
+        if self.bounded:
+            self.transposition.clear()
+
+        sign = 1 if self.x_to_move(xs, os) else -1
+        empty = self.cells - popcount(xs | os)
+        depth = empty if depth is None else min(depth, empty)
+        cells = self.candidates(xs, os)
+        best = (cells[0], 0)
+
+        # Deepening only pays off under a time limit, otherwise the
+        # position is searched once, at full depth
+        first = 1 if time_limit is not None else max(depth, 1)
+
+        start = time.perf_counter()
+        for current in range(first, depth + 1):
+
+            # Always finish the first iteration, so there is a move
+            if time_limit is not None and current > 1:
+                self.deadline = start + time_limit
+            self.stop = stop
+            try:
+                if workers is None:
+                    best = self.root(xs, os, current, cells)
+                else:
+                    best = self.parallel_root(xs, os, current, cells,
+                                              workers)
+            except Timeout:
+                break
+            finally:
+                self.deadline = self.stop = None
+            stats["depth"] = current
+
+            # Search the best cell first in the next iteration
+            cells.remove(best[0])
+            cells.insert(0, best[0])
+
+            # Stop once the result can no longer change
+            if abs(best[1]) > DECIDED:
+                break
+
+        return best[0], sign * best[1]
+
+    def alphabeta(self, xs, os):
+        """
+        Returns (cell, value) for the player to move, searched to the
+        end of the game, where value is 1 if X wins with perfect play,
+        -1 if O does and 0 for a tie. Only practical on small boards.
+        """
+        cell, score = self.search(xs, os)
+        return cell, (score > DECIDED) - (score < -DECIDED)
+
+    def exhaustive(self, xs, os):
+        """
+        Returns (cell, value) like alphabeta, by visiting the full game
+        tree without pruning or caching. Only useful as a reference; the
+        number of nodes visited is left in stats["nodes"].
+        """
+        def search(xs, os):
+            stats["nodes"] += 1
+            if self.terminal(xs, os):
+                return self.winner(xs, os)
+            scores = [search(*self.play(xs, os, cell))
+                      for cell in self.moves(xs, os)]
+            return max(scores) if self.x_to_move(xs, os) else min(scores)
+
+        stats["nodes"] = 1
+        if self.terminal(xs, os):
+            return None, self.winner(xs, os)
+
+        sign = 1 if self.x_to_move(xs, os) else -1
+        best_cell, best_score = None, None
+        for cell in self.moves(xs, os):
+            score = search(*self.play(xs, os, cell))
+            if best_score is None or sign * score > sign * best_score:
+                best_cell, best_score = cell, score
+        return best_cell, best_score
+
+
+class Workers():
+    """A process pool for parallel root searches, see Game.search."""
+
+    def __init__(self, processes=None):
+
+        # Best root score so far, read by every task as it starts, and
+        # the event that ends every task of a cancelled search
+        self.alpha = multiprocessing.Value("q", NO_SCORE)
+        self.stop = multiprocessing.Event()
+        self.pool = multiprocessing.Pool(processes, initializer=init_worker,
+                                         initargs=(self.alpha, self.stop))
+
+    def close(self):
+        """Shuts the pool down once its workers are idle."""
+        self.pool.close()
+        self.pool.join()
+
+
+def init_worker(alpha, stop):
+    """Keeps the shared root alpha and stop event in a worker process."""
+    global shared_alpha, shared_stop
+    shared_alpha, shared_stop = alpha, stop
+
+
+def search_root_cell(task):
+    """
+    Searches one root cell in a worker and returns (cell, score,
+    nodes), with a None score if its time ran out or the search was
+    stopped first. Scores at or above the shared alpha are exact and
+    raise it.
+    """
+    size, k, xs, os, depth, cell, remaining = task
+
+    # Tasks still queued when the search ends are skipped
+    if shared_stop.is_set():
+        return cell, None, 0
+    engine = game(size, k)
+    stats["nodes"] = 0
+
+    alpha = shared_alpha.value
+    bound = -math.inf if alpha == NO_SCORE else alpha - 1
+    if remaining is not None:
+        engine.deadline = time.perf_counter() + remaining
+    engine.stop = shared_stop
+    try:
+        child = -engine.negamax(*engine.play(xs, os, cell), depth - 1,
+                                -math.inf, -unage(bound))
+    except Timeout:
+        return cell, None, stats["nodes"]
+    finally:
+        engine.deadline = engine.stop = None
+
+    score = age(child)
+    if score > bound:
+        with shared_alpha.get_lock():
+            shared_alpha.value = max(shared_alpha.value, score)
+    return cell, score, stats["nodes"]
+
+
+# Games by (size, k), so their transposition tables outlive a search
+games = {}
+
+
+def game(size=3, k=3):
+    """Returns the shared Game for a board size and win length."""
+    if (size, k) not in games:
+        games[size, k] = Game(size, k)
+    return games[size, k]
@@ -0,0 +1,104 @@
+"""
+Perfect-play opening book for 3 x 3 Tic Tac Toe.
+
+Every position reachable from the empty board is solved once and
+stored with its best move and value, so minimax can answer with a
+single lookup. Each entry is one 32-bit word:
+
+    (xs << 9 | os) << 6 | cell << 2 | value + 1
+
+Build the book with
+
+    python book.py
+"""
+
+import os
+import struct
+from array import array
+
+import bitboard
+
+MAGIC = b"TTTBOOK\0"
+VERSION = 1
+FILENAME = "book.bin"
+PREFIX = struct.Struct("<8sIII")
+
+# The board the book covers
+SIZE = 3
+WIN = 3
+
+
+def path_for(directory=None):
+    """Returns the book path, next to this module by default."""
+    if directory is None:
+        directory = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(directory, FILENAME)
+
+
+def positions(game):
+    """Returns every non-terminal position reachable from the empty board."""
+    seen = set()
+    stack = [(0, 0)]
+    while stack:
+        xs, os_ = stack.pop()
+        if (xs, os_) in seen or game.terminal(xs, os_):
+            continue
+        seen.add((xs, os_))
+        for cell in game.moves(xs, os_):
+            stack.append(game.play(xs, os_, cell))
+    return sorted(seen)
+
+
+def build():
+    """Solves every position and returns the packed entries."""
+    game = bitboard.game(SIZE, WIN)
+    entries = array("I")
+    for xs, os_ in positions(game):
+        cell, value = game.alphabeta(xs, os_)
+        key = xs << game.cells | os_
+        entries.append(key << 6 | cell << 2 | value + 1)
+    return entries
+
+
+def save(entries, directory=None):
+    """Writes the packed entries to the book file, atomically."""
+    path = path_for(directory)
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, "wb") as f:
+        f.write(PREFIX.pack(MAGIC, VERSION, SIZE, len(entries)))
+        entries.tofile(f)
+    os.replace(temp, path)
+
+
+def load(directory=None):
+    """
+    Returns the book as a dict from (xs, os) to (cell, value), or None
+    if there is no valid book file.
+    """
+    try:
+        with open(path_for(directory), "rb") as f:
+            magic, version, size, count = PREFIX.unpack(f.read(PREFIX.size))
+            if magic != MAGIC or version != VERSION or size != SIZE:
+                return None
+            entries = array("I")
+            entries.fromfile(f, count)
+    except (OSError, EOFError, struct.error):
+        return None
+
+    cells = SIZE * SIZE
+    mask = (1 << cells) - 1
+    book = {}
+    for entry in entries:
+        key = entry >> 6
+        book[key >> cells, key & mask] = (entry >> 2 & 15, (entry & 3) - 1)
+    return book
+
+
+def main():
+    entries = build()
+    save(entries)
+    print(f"Wrote {len(entries)} positions to {path_for()}.")
+
+
+if __name__ == "__main__":
+    main()
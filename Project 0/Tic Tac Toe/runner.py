@@ -1,9 +1,17 @@
 import pygame
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import tictactoe as ttt
 
+# Usage: python runner.py [size] [win], e.g. 5 4 for four in a row on 5x5
+if len(sys.argv) > 3:
+    sys.exit("Usage: python runner.py [size] [win]")
+board_size = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+ttt.configure(board_size, int(sys.argv[2]) if len(sys.argv) > 2 else None)
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -15,16 +23,40 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+
+# Tiles shrink so larger boards still fit between the title and button
+tile_size = min(80, 260 // board_size)
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
 
 user = None
 board = ttt.initial_state()
-ai_turn = False
+
+# The AI searches on a worker thread so the window keeps drawing. One
+# worker means a cancelled search ends before the next one starts.
+ai_worker = ThreadPoolExecutor(max_workers=1)
+
+# Hand the interpreter back to the drawing thread more often than the
+# default 5 ms, so the frame rate holds while the worker searches
+sys.setswitchinterval(0.001)
+ai_move = None
+ai_stop = None
+clock = pygame.time.Clock()
+
+
+def cancel_ai():
+    """Stops the AI's search, if any, and forgets its move."""
+    global ai_move
+    if ai_move is not None:
+        ai_stop.set()
+        ai_move = None
+
 
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            cancel_ai()
+            ai_worker.shutdown()
             sys.exit()
 
     screen.fill(black)
@@ -67,13 +99,12 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (board_size / 2 * tile_size),
+                       height / 2 - (board_size / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(board_size):
             row = []
-            for j in range(3):
+            for j in range(board_size):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -102,45 +133,47 @@ while True:
         elif user == player:
             title = f"Play as {user}"
         else:
-            title = f"Computer thinking..."
+            dots = "." * (pygame.time.get_ticks() // 300 % 4)
+            title = f"Computer thinking{dots:<3}"
         title = largeFont.render(title, True, white)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Start the AI's search, then poll for its move
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+            if ai_move is None:
+                ai_stop = threading.Event()
+                ai_move = ai_worker.submit(ttt.minimax, board, ai_stop)
+            elif ai_move.done():
+                board = ttt.result(board, ai_move.result())
+                ai_move = None
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(board_size):
+                for j in range(board_size):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
-        if game_over:
-            againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
-            again = mediumFont.render("Play Again", True, black)
-            againRect = again.get_rect()
-            againRect.center = againButton.center
-            pygame.draw.rect(screen, white, againButton)
-            screen.blit(again, againRect)
-            click, _, _ = pygame.mouse.get_pressed()
-            if click == 1:
-                mouse = pygame.mouse.get_pos()
-                if againButton.collidepoint(mouse):
-                    time.sleep(0.2)
-                    user = None
-                    board = ttt.initial_state()
-                    ai_turn = False
+        # The game can be reset at any time, even while the AI thinks
+        againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
+        label = "Play Again" if game_over else "Reset"
+        again = mediumFont.render(label, True, black)
+        againRect = again.get_rect()
+        againRect.center = againButton.center
+        pygame.draw.rect(screen, white, againButton)
+        screen.blit(again, againRect)
+        click, _, _ = pygame.mouse.get_pressed()
+        if click == 1:
+            mouse = pygame.mouse.get_pos()
+            if againButton.collidepoint(mouse):
+                time.sleep(0.2)
+                cancel_ai()
+                user = None
+                board = ttt.initial_state()
 
     pygame.display.flip()
+    clock.tick(60)
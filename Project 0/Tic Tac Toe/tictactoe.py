@@ -2,48 +2,131 @@
 Tic Tac Toe Player
 """
 
-import math
+import bitboard
+import book
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Board size and the number of marks in a row that wins, see configure
+SIZE = 3
+WIN = 3
+
+# Seconds minimax may think about a move when the board is too large
+# to search to the end of the game
+TIME_LIMIT = 1.0
+
+# Boards with more cells than this are searched under TIME_LIMIT
+EXACT_CELLS = 9
+
+# Processes that share the root moves of those searches, see configure
+WORKERS = 1
+workers = None
+
+# Counters of the last search, shared with the bitboard engine
+stats = bitboard.stats
+
+# Solved 3 x 3 positions from book.bin, loaded on first use
+opening_book = None
+
+
+def configure(size=3, win=None, time_limit=1.0, processes=1):
+    """
+    Sets the board size, the number in a row needed to win (the
+    board size by default), minimax's time limit per move and the
+    number of processes it searches larger boards with.
+    """
+    global SIZE, WIN, TIME_LIMIT, WORKERS, workers
+    win = size if win is None else win
+    if not 1 <= win <= size:
+        raise ValueError("win length must be between 1 and the size")
+    if processes < 1:
+        raise ValueError("processes must be at least 1")
+    SIZE, WIN, TIME_LIMIT = size, win, time_limit
+    if processes != WORKERS and workers is not None:
+        workers.close()
+        workers = None
+    WORKERS = processes
+
+
+def get_workers():
+    """Returns the process pool for minimax, or None to search serially."""
+    global workers
+    if WORKERS > 1 and workers is None:
+        workers = bitboard.Workers(WORKERS)
+    return workers
+
 
 def initial_state():
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * SIZE for _ in range(SIZE)]
+
+
+def get_book():
+    """Returns the opening book, empty if book.bin was never built."""
+    global opening_book
+    if opening_book is None:
+        opening_book = book.load() or {}
+    return opening_book
+
+
+def game(board):
+    """Returns the bitboard engine for the size of a board."""
+    return bitboard.game(len(board), min(WIN, len(board)))
+
+
+def to_bits(board):
+    """
+    Returns the (xs, os) bitboards of a board, where bit N * i + j
+    is set when the player holds cell (i, j).
+    """
+    size = len(board)
+    xs = os = 0
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell == X:
+                xs |= 1 << (size * i + j)
+            elif cell == O:
+                os |= 1 << (size * i + j)
+    return xs, os
+
+
+def to_action(board, cell):
+    """Returns the (i, j) action of a bitboard cell number."""
+    return None if cell is None else divmod(cell, len(board))
 
 
 def player(board):
     """
     Returns player who has the next turn on a board.
     """
+    engine = game(board)
+    xs, os = to_bits(board)
+
     # If the game ends, we don't care about the player
-    if terminal(board):
+    if engine.terminal(xs, os):
         return None
 
-    # Looping over the board to count X and O, if both 0 then the player is X
-    xcount = sum([1 for i in range(3) for j in range(3) if board[i][j] == X])
-    ocount = sum([1 for i in range(3) for j in range(3) if board[i][j] == O])
-
-    # even if both are 0, then x will play
-    return X if ocount == xcount else O
+    # Even if both counts are 0, then X will play
+    return X if engine.x_to_move(xs, os) else O
 
 
 def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
+    engine = game(board)
+    xs, os = to_bits(board)
+
     # Check if the game is finished
-    if terminal(board):
+    if engine.terminal(xs, os):
         return None
 
     # The set of all possible actions
-    return {(i, j) for i in range(3) for j in range(3) if board[i][j] == EMPTY}
+    return {to_action(board, cell) for cell in engine.moves(xs, os)}
 
 
 def result(board, action):
@@ -51,19 +134,15 @@ def result(board, action):
     Returns the board that results from making move (i, j) on the board.
     """
     # Check if action is not valid
-    if (action[0] < 0 or action[0] > 2) or (action[1] < 0 or action[1] > 2):
+    size = len(board)
+    if not (0 <= action[0] < size and 0 <= action[1] < size):
         raise Exception(" Out of bound exception.")
 
     # The player with the current turn
     turn = player(board)
 
-    # copy the board
-    result = initial_state()
-    for row in range(3):
-        for col in range(3):
-            result[row][col] = board[row][col]
-
-    # Making the action
+    # Copy the board and make the action
+    result = [row[:] for row in board]
     result[action[0]][action[1]] = turn
 
     return result
@@ -73,92 +152,73 @@ def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
-    # Listing the columns
-    cols = [[board[0][0], board[1][0], board[2][0]],
-            [board[0][1], board[1][1], board[2][1]],
-            [board[0][2], board[1][2], board[2][2]]]
-
-    # Check for diagonals
-    if board[0][0] == board[1][1] and board[0][0] == board[2][2] and board[0][0] != EMPTY:
-        return board[0][0]
-
-    if board[0][2] == board[1][1] and board[0][2] == board[2][0] and board[0][2] != EMPTY:
-        return board[0][2]
-
-    # Loop for checking columns
-    for col in cols:
-        # Check if all elements in column are equal
-        if all(cell == col[0] and col[0] != EMPTY for cell in col):
-            return col[0]
-
-    # Loop for checking rows
-    for row in board:
-        # Check if all elements in a row are equal
-        if all(cell == row[0] and row[0] != EMPTY for cell in row):
-            return row[0]
-
-    # if there still no winner
-    return None
+    return {1: X, -1: O}.get(game(board).winner(*to_bits(board)))
 
 
 def terminal(board):
     """
     Returns True if game is over, False otherwise.
     """
-    # Check if there is a winner
-    # Check if every cell is filled
-    return True if winner(board) != None or all(cell for row in board for cell in row) else False
+    return game(board).terminal(*to_bits(board))
 
 
 def utility(board):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    # Assuming the we have a terminal board
-    return 1 if winner(board) == X else -1 if winner(board) == O else 0
+    return game(board).winner(*to_bits(board))
 
 
-def minimax(board):
+def alphabeta(board):
     """
-    Returns the optimal action for the current player on the board.
+    Returns (action, value) for the player to move in a single
+    alpha-beta pass, where value is 1 if X wins with perfect play,
+    -1 if O does and 0 for a tie. The action is None on a finished
+    board. The number of nodes visited is left in stats["nodes"].
+    This searches to the end of the game, so it suits small boards.
     """
-    # Method to retreive the max/min-value
-    def value(board, maxmin):
+    cell, score = game(board).alphabeta(*to_bits(board))
+    return to_action(board, cell), score
 
-        # Check if the game is terminated, then return utility
-        if terminal(board):
-            return utility(board)
 
-        # Set of all possible actions
-        actions_set = actions(board)
+def exhaustive(board):
+    """
+    Returns (action, value) like alphabeta, by visiting the full game
+    tree without pruning or caching. Only useful as a reference; the
+    number of nodes visited is left in stats["nodes"].
+    """
+    cell, score = game(board).exhaustive(*to_bits(board))
+    return to_action(board, cell), score
 
-        # Return the min/max-value of all the max/min-values in the list of resulting utilities from actions
-        return min([
-            value(result(board, action), "max") for action in actions_set
-        ]) if maxmin == "min" else max([
-            value(result(board, action), "min") for action in actions_set
-        ])
 
-    # Checking for the turn
-    turn = player(board)
+def value(board):
+    """
+    Returns the minimax value of a board: 1 if X wins with perfect
+    play, -1 if O does, 0 for a tie.
+    """
+    return alphabeta(board)[1]
+
+
+def minimax(board, stop=None):
+    """
+    Returns the optimal action for the current player on the board.
 
-    # List of all possible actions
-    actions_set = actions(board)
-
-    # Looping over all possible actions
-    for action in actions_set:
-        new_board = result(board, action)
-
-        # If turn is X ==> we look for max-value
-        if turn == X:
-            # If the min-value resulting from the board after making this action
-            # is the same as max-value of the current board ==> return the action
-            if value(new_board, "min") == value(board, "max"):
-                return action
-
-        # If turn is O ==> we look for min-value
-        elif turn == O:
-            # If the max-value resulting from the board after making this action
-            # is the same as min-value of the current board ==> return the action
-            if value(new_board, "max") == value(board, "min"):
-                return action
+    The classic board is answered from the opening book when it has
+    been built (python book.py). Otherwise boards of up to EXACT_CELLS
+    cells are searched to the end of the game, and larger ones get an
+    iterative-deepening search with a heuristic evaluation, which
+    answers within TIME_LIMIT seconds, on WORKERS processes. Setting
+    the optional `stop` event from another thread cancels the search.
+    """
+    engine = game(board)
+    if (engine.size, engine.k) == (book.SIZE, book.WIN):
+        entry = get_book().get(to_bits(board))
+        if entry is not None:
+            return to_action(board, entry[0])
+
+    if engine.cells <= EXACT_CELLS:
+        cell, _ = engine.search(*to_bits(board), stop=stop)
+    else:
+        cell, _ = engine.search(*to_bits(board), time_limit=TIME_LIMIT,
+                                stop=stop, workers=get_workers())
+    return to_action(board, cell)
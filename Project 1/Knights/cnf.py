@@ -0,0 +1,142 @@
+"""
+Tseitin conversion of logic.py sentences to clauses in conjunctive
+normal form.
+
+Distributing Or over And can blow up exponentially, as it does on
+the nested Biconditionals of puzzle.py. The Tseitin encoding instead
+gives every connective a fresh variable defined to be equal to it,
+so the clauses stay linear in the size of the sentence and have a
+model exactly when the sentence does; on the symbols' variables, the
+models are the same.
+
+Clauses are lists of non-zero integers as in DIMACS: variable v is v
+when true and -v when false. Variables are numbered in the order
+symbols and connectives are met, and CNF.variables maps each symbol
+name to its variable. For example
+
+    cnf = CNF([knowledge, Not(query)])
+    with open("puzzle.cnf", "w") as f:
+        cnf.write(f)
+
+writes a file any SAT solver reading DIMACS can decide.
+"""
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+
+class CNF():
+    def __init__(self, sentences=()):
+
+        # Clauses, the variable of every symbol by name, and the
+        # variable defined for each connective already encoded
+        self.clauses = []
+        self.variables = {}
+        self.definitions = {}
+        self.num_vars = 0
+
+        for sentence in sentences:
+            self.add(sentence)
+
+    def new_var(self):
+        """Returns a fresh variable."""
+        self.num_vars += 1
+        return self.num_vars
+
+    def add(self, sentence):
+        """
+        Adds clauses that hold exactly when a sentence is true. Top-level
+        conjunctions and disjunctions become plain clauses, without a
+        variable of their own.
+        """
+        pending = [sentence]
+        while pending:
+            sentence = pending.pop()
+            if isinstance(sentence, And):
+                pending.extend(reversed(sentence.conjuncts))
+            elif isinstance(sentence, Or):
+                self.clauses.append([self.literal(disjunct)
+                                     for disjunct in sentence.disjuncts])
+            else:
+                self.clauses.append([self.literal(sentence)])
+
+    def known(self, sentence):
+        """
+        Returns the literal of a sentence if it has one yet, else None.
+        Symbols get a variable the first time they are seen.
+        """
+        sign = 1
+        while isinstance(sentence, Not):
+            sentence, sign = sentence.operand, -sign
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.variables:
+                self.variables[sentence.name] = self.new_var()
+            return sign * self.variables[sentence.name]
+        var = self.definitions.get(sentence)
+        return None if var is None else sign * var
+
+    def literal(self, sentence):
+        """
+        Returns a literal equal to a sentence, defining a variable for
+        it and for its operands as needed. Works bottom-up with a stack,
+        so deeply nested sentences do not hit the recursion limit.
+        """
+        pending = [sentence]
+        while pending:
+            top = pending[-1]
+            while isinstance(top, Not):
+                top = top.operand
+            if self.known(top) is not None:
+                pending.pop()
+                continue
+            missing = [operand for operand in operands(top)
+                       if self.known(operand) is None]
+            if missing:
+                pending.extend(missing)
+            else:
+                pending.pop()
+                self.define(top)
+        return self.known(sentence)
+
+    def define(self, sentence):
+        """Adds a variable equal to a connective whose operands are known."""
+        lits = [self.known(operand) for operand in operands(sentence)]
+        var = self.new_var()
+        if isinstance(sentence, And):
+            self.clauses.extend([-var, lit] for lit in lits)
+            self.clauses.append([var] + [-lit for lit in lits])
+        elif isinstance(sentence, Or):
+            self.clauses.extend([var, -lit] for lit in lits)
+            self.clauses.append([-var] + lits)
+        elif isinstance(sentence, Implication):
+            a, b = lits
+            self.clauses.extend([[-var, -a, b], [var, a], [var, -b]])
+        else:
+            a, b = lits
+            self.clauses.extend([[-var, -a, b], [-var, a, -b],
+                                 [var, a, b], [var, -a, -b]])
+        self.definitions[sentence] = var
+
+    def dimacs(self):
+        """Returns the clauses in DIMACS format, naming the symbols."""
+        lines = [f"c {var} {name}" for name, var in self.variables.items()]
+        lines.append(f"p cnf {self.num_vars} {len(self.clauses)}")
+        lines.extend(" ".join(map(str, clause)) + " 0"
+                     for clause in self.clauses)
+        return "\n".join(lines) + "\n"
+
+    def write(self, file):
+        """Writes the clauses in DIMACS format to an open text file."""
+        file.write(self.dimacs())
+
+
+def operands(sentence):
+    """Returns the operands of a connective other than Not."""
+    if isinstance(sentence, And):
+        return sentence.conjuncts
+    if isinstance(sentence, Or):
+        return sentence.disjuncts
+    if isinstance(sentence, Implication):
+        return (sentence.antecedent, sentence.consequent)
+    if isinstance(sentence, Biconditional):
+        return (sentence.left, sentence.right)
+    raise TypeError(f"cannot encode {type(sentence).__name__}")
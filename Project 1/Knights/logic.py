@@ -1,8 +1,59 @@
+import functools
 import itertools
+import weakref
+
+
+def cached(method):
+    """Caches what a sentence method returns, sentences being immutable."""
+    attribute = "_" + method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self):
+        try:
+            return self.__dict__[attribute]
+        except KeyError:
+            value = self.__dict__[attribute] = method(self)
+            return value
+    return wrapper
 
 
 class Sentence():
 
+    # Every live sentence by its structure, so that structurally equal
+    # sentences are one shared object
+    interned = weakref.WeakValueDictionary()
+
+    @classmethod
+    def intern(cls, key, **fields):
+        """
+        Returns the sentence of this class with the given structure,
+        creating it from `fields` if none is alive. The key starts with
+        the class tag and holds the (interned) operands, so it hashes
+        in constant time.
+        """
+        sentence = Sentence.interned.get(key)
+        if sentence is None:
+            sentence = object.__new__(cls)
+            sentence.__dict__.update(fields, _hash=hash(key))
+            Sentence.interned[key] = sentence
+
+            # The operands' symbols are cached already, so this is cheap
+            # and later calls never recurse
+            sentence.symbols()
+        return sentence
+
+    def __eq__(self, other):
+        return self is other
+
+    def __hash__(self):
+        return self._hash
+
+    def __setattr__(self, name, value):
+        raise AttributeError("sentences are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("sentences are immutable")
+
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
@@ -12,8 +63,23 @@ class Sentence():
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozenset of all symbols in the logical sentence."""
+        return frozenset()
+
+    def evaluate_all(self, models):
+        """
+        Evaluates the logical sentence in every model at once, returning
+        an integer whose bit i is set when it is true in model i.
+        """
+        raise Exception("nothing to evaluate")
+
+    def evaluate_partial(self, model):
+        """
+        Evaluates the logical sentence in a model that may leave symbols
+        unassigned, returning True or False if that settles it and None
+        if it depends on the unassigned symbols.
+        """
+        raise Exception("nothing to evaluate")
 
     @classmethod
     def validate(cls, sentence):
@@ -44,14 +110,11 @@ class Sentence():
 
 class Symbol(Sentence):
 
-    def __init__(self, name):
-        self.name = name
+    def __new__(cls, name):
+        return cls.intern(("symbol", name), name=name)
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
-
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __reduce__(self):
+        return (Symbol, (self.name,))
 
     def __repr__(self):
         return self.name
@@ -65,20 +128,28 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
+    @cached
     def symbols(self):
-        return {self.name}
+        return frozenset([self.name])
+
+    def evaluate_all(self, models):
+        try:
+            return models.columns[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in models")
+
+    def evaluate_partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
 
 
 class Not(Sentence):
-    def __init__(self, operand):
+    def __new__(cls, operand):
         Sentence.validate(operand)
-        self.operand = operand
+        return cls.intern(("not", operand), operand=operand)
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
-
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def __reduce__(self):
+        return (Not, (self.operand,))
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,26 +157,29 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    @cached
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
     def symbols(self):
         return self.operand.symbols()
 
+    def evaluate_all(self, models):
+        return models.everything ^ self.operand.evaluate_all(models)
+
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        return None if value is None else not value
+
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
+        return cls.intern(("and", conjuncts), conjuncts=conjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
-
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+    def __reduce__(self):
+        return (And, self.conjuncts)
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,35 +188,49 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        raise TypeError("sentences are immutable, "
+                        "use And(*knowledge.conjuncts, conjunct) instead")
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    @cached
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
+    @cached
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        return frozenset().union(
+            *[conjunct.symbols() for conjunct in self.conjuncts])
+
+    def evaluate_all(self, models):
+        result = models.everything
+        for conjunct in self.conjuncts:
+            result &= conjunct.evaluate_all(models)
+        return result
+
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return cls.intern(("or", disjuncts), disjuncts=disjuncts)
 
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    def __reduce__(self):
+        return (Or, self.disjuncts)
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -151,30 +239,44 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    @cached
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
+    @cached
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        return frozenset().union(
+            *[disjunct.symbols() for disjunct in self.disjuncts])
+
+    def evaluate_all(self, models):
+        result = 0
+        for disjunct in self.disjuncts:
+            result |= disjunct.evaluate_all(models)
+        return result
+
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
+        return cls.intern(("implies", antecedent, consequent),
+                          antecedent=antecedent, consequent=consequent)
 
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
-
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def __reduce__(self):
+        return (Implication, (self.antecedent, self.consequent))
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,29 +285,41 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    @cached
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
+    @cached
     def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+        return self.antecedent.symbols() | self.consequent.symbols()
+
+    def evaluate_all(self, models):
+        return ((models.everything ^ self.antecedent.evaluate_all(models))
+                | self.consequent.evaluate_all(models))
+
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is None or consequent is None:
+            return None
+        return False
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
+        return cls.intern(("biconditional", left, right),
+                          left=left, right=right)
 
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def __reduce__(self):
+        return (Biconditional, (self.left, self.right))
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -216,33 +330,92 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    @cached
     def formula(self):
-        left = Sentence.parenthesize(str(self.left))
-        right = Sentence.parenthesize(str(self.right))
+        left = Sentence.parenthesize(self.left.formula())
+        right = Sentence.parenthesize(self.right.formula())
         return f"{left} <=> {right}"
 
+    @cached
     def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+        return self.left.symbols() | self.right.symbols()
+
+    def evaluate_all(self, models):
+        return models.everything ^ (self.left.evaluate_all(models)
+                                    ^ self.right.evaluate_all(models))
+
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
+
+
+class Models():
+    """
+    Every model of a set of symbols, as bit vectors packed into
+    integers: bit i stands for model i, in which symbol number j is
+    true when bit j of i is set.
+    """
+
+    # Beyond this, one vector takes more than 8 MiB
+    MAX_SYMBOLS = 26
+
+    def __init__(self, symbols):
+        if len(symbols) > Models.MAX_SYMBOLS:
+            raise ValueError(f"too many symbols for a truth table "
+                             f"({len(symbols)}), use method=\"sat\"")
+        self.count = 1 << len(symbols)
+        self.everything = (1 << self.count) - 1
+
+        # Symbol j repeats 2^j false models then 2^j true ones, so its
+        # column is that period doubled until it covers every model
+        self.columns = {}
+        for j, name in enumerate(sorted(symbols)):
+            width = 2 << j
+            column = ((1 << (width // 2)) - 1) << (width // 2)
+            while width < self.count:
+                column |= column << width
+                width *= 2
+            self.columns[name] = column
+
+
+def model_check(knowledge, query, method="enumerate"):
+    """
+    Checks if knowledge base entails query.
+
+    method is "enumerate" to check every model, "truthtable" to check
+    them all at once as bit vectors (up to Models.MAX_SYMBOLS symbols),
+    or "sat" to decide whether knowledge ∧ ¬query is unsatisfiable
+    with the SAT solver in sat.py, which scales to far more symbols.
+    """
+    if method != "enumerate":
+        return model_check_many(knowledge, [query], method)[query]
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
 
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
+        # Stop as soon as the partial model settles knowledge => query:
+        # it holds where the knowledge base is already false or the
+        # query already true, and a true knowledge base with a false
+        # query is a counterexample however the rest is assigned
+        known = knowledge.evaluate_partial(model)
+        if known is False:
+            return True
+        entailed = query.evaluate_partial(model)
+        if entailed is True:
             return True
+        if known is True and entailed is False:
+            return False
+
+        # A complete model always settles it, so symbols remain here
         else:
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
+            # Choose the next symbol in order
+            p, remaining = symbols[0], symbols[1:]
 
             # Create a model where the symbol is true
             model_true = model.copy()
@@ -256,8 +429,95 @@ def model_check(knowledge, query):
             return (check_all(knowledge, query, remaining, model_true) and
                     check_all(knowledge, query, remaining, model_false))
 
-    # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    # Get all symbols in both knowledge and query, the ones that settle
+    # the most sentences first
+    symbols = branching_order(knowledge, [query])
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def branching_order(knowledge, queries):
+    """
+    Returns the symbols of the knowledge base and queries, the ones
+    that appear in the most top-level conjuncts of the knowledge base
+    first, so that partial models decide conjuncts and prune early.
+    """
+    conjuncts = list(queries)
+    pending = [knowledge]
+    while pending:
+        sentence = pending.pop()
+        if isinstance(sentence, And):
+            pending.extend(sentence.conjuncts)
+        else:
+            conjuncts.append(sentence)
+
+    counts = {}
+    for conjunct in conjuncts:
+        for symbol in conjunct.symbols():
+            counts[symbol] = counts.get(symbol, 0) + 1
+    return sorted(counts, key=lambda symbol: (-counts[symbol], symbol))
+
+
+def model_check_many(knowledge, queries, method="enumerate"):
+    """
+    Checks which of several queries the knowledge base entails, and
+    returns a dict mapping each query to True or False.
+
+    The models of the knowledge base are enumerated once, with the
+    same partial-model pruning as model_check, and each branch carries
+    the queries it has not settled yet, instead of enumerating once
+    per query. method is as for model_check.
+    """
+    queries = list(queries)
+    if method == "sat":
+        import sat
+        return {query: sat.entails(knowledge, query) for query in queries}
+
+    symbols = knowledge.symbols().union(*[q.symbols() for q in queries])
+    if method == "truthtable":
+        models = Models(symbols)
+        knowledge_true = knowledge.evaluate_all(models)
+        return {query: knowledge_true & ~query.evaluate_all(models) == 0
+                for query in queries}
+    if method != "enumerate":
+        raise ValueError(f"unknown model checking method {method!r}")
+
+    entailed = dict.fromkeys(queries, True)
+
+    def check_all(undecided, symbols, model):
+        """Refutes the undecided queries that fail under a partial model."""
+
+        # Nothing is refuted where the knowledge base is already false
+        known = knowledge.evaluate_partial(model)
+        if known is False:
+            return
+
+        # Queries already true hold in this branch, and queries already
+        # false under a true knowledge base are refuted for good
+        pending = []
+        for query in undecided:
+            value = query.evaluate_partial(model)
+            if value is True:
+                continue
+            if known is True and value is False:
+                entailed[query] = False
+            else:
+                pending.append(query)
+
+        # A complete model settles every query, so symbols remain here
+        if not pending:
+            return
+        p, remaining = symbols[0], symbols[1:]
+        for value in (True, False):
+            branch = model.copy()
+            branch[p] = value
+            check_all(pending, remaining, branch)
+
+            # Skip queries the first branch refuted, and stop once all are
+            pending = [query for query in pending if entailed[query]]
+            if not pending:
+                return
+
+    check_all(list(entailed), branching_order(knowledge, entailed), {})
+    return entailed
@@ -0,0 +1,301 @@
+"""
+CDCL SAT solver for entailment checks on logic.py sentences.
+
+A knowledge base entails a query exactly when KB ∧ ¬query has no
+model. The sentence is turned into clauses with the Tseitin encoding
+of cnf.py, and the clauses are decided by a conflict-driven clause
+learning solver: unit propagation over two watched literals per
+clause, first-UIP clause learning with non-chronological backjumping,
+activity-based branching with saved phases, and Luby restarts.
+
+Literals are non-zero integers as in DIMACS: variable v is v when
+true and -v when false.
+"""
+
+import heapq
+
+from cnf import CNF
+from logic import Not
+
+# Conflicts per unit of the Luby restart sequence
+RESTART_BASE = 100
+
+# Activity decay per conflict, and the bound that triggers rescaling
+DECAY = 0.95
+RESCALE = 1e100
+
+
+class Solver():
+    def __init__(self):
+
+        # Clauses as lists whose first two literals are watched
+        self.clauses = []
+        self.watches = {}
+
+        # Per variable, indexed from 1: value (1 true, -1 false, 0 not
+        # assigned), decision level, reason clause index and activity
+        self.value = [0]
+        self.level = [0]
+        self.reason = [None]
+        self.activity = [0.0]
+        self.phase = [False]
+        self.order = []
+        self.increment = 1.0
+
+        # Assigned literals in order, where each decision level starts,
+        # and the next literal to propagate
+        self.trail = []
+        self.limits = []
+        self.head = 0
+
+        # False once the clauses are known to be unsatisfiable
+        self.ok = True
+
+    def reserve(self, var):
+        """Makes room for variables up to `var`."""
+        while len(self.value) <= var:
+            self.value.append(0)
+            self.level.append(0)
+            self.reason.append(None)
+            self.activity.append(0.0)
+            self.phase.append(False)
+            self.watches[len(self.value) - 1] = []
+            self.watches[1 - len(self.value)] = []
+            heapq.heappush(self.order, (0.0, len(self.value) - 1))
+
+    def lit_value(self, lit):
+        """Returns 1 if a literal is true, -1 if false, 0 if unassigned."""
+        value = self.value[abs(lit)]
+        return value if lit > 0 else -value
+
+    def add_clause(self, clause):
+        """
+        Adds a clause, an iterable of literals. Returns False if the
+        clauses have become unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        lits = set(clause)
+        if any(-lit in lits for lit in lits):
+            return True
+        self.reserve(max((abs(lit) for lit in lits), default=0))
+
+        # Clauses are only added before solving, at decision level 0
+        lits = [lit for lit in lits if self.lit_value(lit) != -1]
+        if any(self.lit_value(lit) == 1 for lit in lits):
+            return True
+        if not lits:
+            self.ok = False
+        elif len(lits) == 1:
+            self.enqueue(lits[0], None)
+        else:
+            self.watch(lits)
+        return self.ok
+
+    def watch(self, lits):
+        """Stores a clause and watches its first two literals."""
+        index = len(self.clauses)
+        self.clauses.append(lits)
+        self.watches[lits[0]].append(index)
+        self.watches[lits[1]].append(index)
+        return index
+
+    def enqueue(self, lit, reason):
+        """Assigns a literal true at the current decision level."""
+        var = abs(lit)
+        self.value[var] = 1 if lit > 0 else -1
+        self.level[var] = len(self.limits)
+        self.reason[var] = reason
+        self.trail.append(lit)
+
+    def propagate(self):
+        """
+        Propagates every pending assignment. Returns the index of a
+        conflicting clause, or None.
+        """
+        value = self.value
+        while self.head < len(self.trail):
+            false_lit = -self.trail[self.head]
+            self.head += 1
+            watching = self.watches[false_lit]
+            kept = []
+            for i, index in enumerate(watching):
+                clause = self.clauses[index]
+
+                # Keep the false literal second
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                if (value[first] if first > 0 else -value[-first]) == 1:
+                    kept.append(index)
+                    continue
+
+                # Look for another literal that is not false to watch
+                for k in range(2, len(clause)):
+                    lit = clause[k]
+                    if (value[lit] if lit > 0 else -value[-lit]) != -1:
+                        clause[1], clause[k] = lit, false_lit
+                        self.watches[lit].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if (value[first] if first > 0 else -value[-first]) == -1:
+                        kept.extend(watching[i + 1:])
+                        self.watches[false_lit] = kept
+                        return index
+                    self.enqueue(first, index)
+            self.watches[false_lit] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns (clause, level): the first-UIP clause learned from a
+        conflict, its asserting literal first, and the level to jump
+        back to.
+        """
+        current = len(self.limits)
+        seen = set()
+        learned = [None]
+        pending = 0
+        index = len(self.trail) - 1
+        clause, start = self.clauses[conflict], 0
+        while True:
+            for lit in clause[start:]:
+                var = abs(lit)
+                if var not in seen and self.level[var] > 0:
+                    seen.add(var)
+                    self.bump(var)
+                    if self.level[var] == current:
+                        pending += 1
+                    else:
+                        learned.append(lit)
+
+            # The next literal of this level on the trail to resolve on
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            lit = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause, start = self.clauses[self.reason[abs(lit)]], 1
+
+        learned[0] = -lit
+        if len(learned) == 1:
+            return learned, 0
+
+        # Watch the literal assigned last among the others second
+        deepest = max(range(1, len(learned)),
+                      key=lambda i: self.level[abs(learned[i])])
+        learned[1], learned[deepest] = learned[deepest], learned[1]
+        return learned, self.level[abs(learned[1])]
+
+    def bump(self, var):
+        """Raises the activity of a variable found in a conflict."""
+        self.activity[var] += self.increment
+        if self.activity[var] > RESCALE:
+            self.activity = [a / RESCALE for a in self.activity]
+            self.increment /= RESCALE
+            self.order = [(-self.activity[v], v)
+                          for v in range(1, len(self.value))]
+            heapq.heapify(self.order)
+        else:
+            heapq.heappush(self.order, (-self.activity[var], var))
+
+    def cancel_until(self, level):
+        """Undoes every assignment above a decision level."""
+        if len(self.limits) <= level:
+            return
+        start = self.limits[level]
+        for lit in self.trail[start:]:
+            var = abs(lit)
+            self.phase[var] = lit > 0
+            self.value[var] = 0
+            self.reason[var] = None
+            heapq.heappush(self.order, (-self.activity[var], var))
+        del self.trail[start:]
+        del self.limits[level:]
+        self.head = start
+
+    def decide(self):
+        """Returns the unassigned variable with the highest activity."""
+        while self.order:
+            activity, var = heapq.heappop(self.order)
+            if self.value[var] == 0 and -activity == self.activity[var]:
+                return var
+        for var in range(1, len(self.value)):
+            if self.value[var] == 0:
+                return var
+        return None
+
+    def solve(self):
+        """Returns True if the clauses are satisfiable, see model."""
+        if not self.ok:
+            return False
+        conflicts = 0
+        restart = 1
+        budget = RESTART_BASE * luby(restart)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.limits:
+                    self.ok = False
+                    return False
+                learned, level = self.analyze(conflict)
+                self.cancel_until(level)
+                if len(learned) == 1:
+                    self.enqueue(learned[0], None)
+                else:
+                    self.enqueue(learned[0], self.watch(learned))
+                self.increment /= DECAY
+
+                conflicts += 1
+                if conflicts >= budget:
+                    conflicts = 0
+                    restart += 1
+                    budget = RESTART_BASE * luby(restart)
+                    self.cancel_until(0)
+                continue
+
+            var = self.decide()
+            if var is None:
+                return True
+            self.limits.append(len(self.trail))
+            self.enqueue(var if self.phase[var] else -var, None)
+
+    def model(self):
+        """Returns the set of variables true in the last solution."""
+        return {var for var in range(1, len(self.value))
+                if self.value[var] == 1}
+
+
+def luby(i):
+    """Returns the i-th term (from 1) of the Luby sequence 1 1 2 1 1 2 4..."""
+    size = 1
+    while size < i + 1:
+        size = 2 * size + 1
+    while size - 1 != i:
+        size //= 2
+        i %= size
+    return (size + 1) // 2
+
+
+def satisfiable(sentences):
+    """
+    Returns a model of the conjunction of some sentences, as the set
+    of symbol names that are true, or None if it has no model.
+    """
+    encoding = CNF(sentences)
+    solver = Solver()
+    for clause in encoding.clauses:
+        if not solver.add_clause(clause):
+            return None
+    if not solver.solve():
+        return None
+    true = solver.model()
+    return {name for name, var in encoding.variables.items() if var in true}
+
+
+def entails(knowledge, query):
+    """Returns True if the knowledge base entails the query."""
+    return satisfiable([knowledge, Not(query)]) is None